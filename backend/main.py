@@ -4,15 +4,27 @@ FastAPI-based backend for faceless video automation
 """
 
 import asyncio
+import hashlib
+import inspect
 import os
 import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
+import aiofiles
+import aiofiles.os
+import anyio.to_thread
+import httpx
+import orjson
 import uvicorn
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
+from loguru import logger
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
@@ -22,7 +34,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from services.workflow_manager import WorkflowManager
 from services.firecrawl_service import FirecrawlService
 from services.ollama_service import OllamaService
-from services.crewai_service import CrewAIService
+from services.crewai_service import CrewAIService, close_crewai_services, get_crewai_service
 from services.heygem_service import HeyGemService
 from services.tts_service import TTSService
 from services.video_compositor import VideoCompositor
@@ -30,10 +42,22 @@ from models.schemas import (
     TrendSearchRequest, TrendResult, ScriptGenerationRequest,
     TTSRequest, AssetUploadRequest, VideoRenderRequest,
     WorkflowState, TrendItem, ScriptData, AudioData,
-    AvatarData, VideoRenderData
+    AvatarData, VideoRenderData, VideoProgress, WorkflowStep
 )
 
 
+# Filesystem layout, resolved once at import
+BASE_DIR = Path(__file__).resolve().parent.parent
+UPLOADS_DIR = BASE_DIR / "frontend" / "public" / "uploads"
+AVATARS_DIR = UPLOADS_DIR / "avatars"
+LOGOS_DIR = UPLOADS_DIR / "logos"
+BACKGROUNDS_DIR = UPLOADS_DIR / "backgrounds"
+PROJECTS_DIR = BASE_DIR / "projects"
+TEMP_DIR = BASE_DIR / "temp"
+TTS_CACHE_DIR = TEMP_DIR / "tts"
+SCRIPT_CACHE_DIR = TEMP_DIR / "scripts"
+
+
 # Global service instances
 workflow_manager: Optional[WorkflowManager] = None
 firecrawl_service: Optional[FirecrawlService] = None
@@ -43,46 +67,119 @@ heygem_service: Optional[HeyGemService] = None
 tts_service: Optional[TTSService] = None
 video_compositor: Optional[VideoCompositor] = None
 
+# Accepted upload content types
+_IMAGE_MIMES = frozenset({"image/png", "image/jpeg", "image/webp", "image/gif", "image/svg+xml"})
+_VIDEO_MIMES = frozenset({"video/mp4", "video/webm", "video/quicktime"})
+_BG_MIMES = _IMAGE_MIMES | _VIDEO_MIMES
+
+# Pre-encoded bodies for responses that only vary by workflow step
+_NEXT_STEP_RESPONSES = {
+    step.value: orjson.dumps({"status": "success", "next_step": step.value})
+    for step in WorkflowStep
+}
+_VIDEO_APPROVED_RESPONSE = orjson.dumps(
+    {"status": "success", "message": "Video approved and workflow completed"}
+)
+
+# Short-lived cache for rarely changing lookups (voices, Ollama models)
+LOOKUP_CACHE_TTL = 60.0
+_LOOKUP_CACHE: dict[str, tuple[float, Any]] = {}
+
+# Directory listing caches, keyed on directory and invalidated by mtime
+_PROJECTS_CACHE: dict[Path, tuple[tuple, list]] = {}
+_ASSETS_CACHE: dict[Path, tuple[int, list]] = {}
+# One lock per scanned directory, fixed up front so requests can't add more
+_SCAN_LOCKS: dict[Path, asyncio.Lock] = {
+    directory: asyncio.Lock()
+    for directory in (AVATARS_DIR, LOGOS_DIR, BACKGROUNDS_DIR, PROJECTS_DIR)
+}
+
+# Seconds between background health probes of downstream services
+HEALTH_REFRESH_INTERVAL = float(os.getenv("HEALTH_REFRESH_INTERVAL", "5"))
+
+# Latest video progress per project, persisted by a single writer task
+_progress_state: dict[str, dict] = {}
+_progress_queue: Optional[asyncio.Queue] = None
+
+# Minimum seconds between render progress updates
+PROGRESS_REPORT_INTERVAL = 1.0
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager - startup and shutdown events"""
     global workflow_manager, firecrawl_service, ollama_service
     global crewai_service, heygem_service, tts_service, video_compositor
+    global _progress_queue
+    
+    # Route log output through a background thread so sinks never block the loop
+    logger.remove()
+    logger.add(sys.stderr, level=os.getenv("LOG_LEVEL", "INFO"), enqueue=True)
     
     # Startup
-    print("🚀 Starting AutoStream AI Backend...")
+    logger.info("Starting AutoStream AI Backend...")
     
     # Create necessary directories
-    base_dir = Path(__file__).parent.parent
-    uploads_dir = base_dir / "frontend" / "public" / "uploads"
-    avatars_dir = uploads_dir / "avatars"
-    logos_dir = uploads_dir / "logos"
-    backgrounds_dir = uploads_dir / "backgrounds"
-    projects_dir = base_dir / "projects"
-    temp_dir = base_dir / "temp"
-    
-    for dir_path in [uploads_dir, avatars_dir, logos_dir, backgrounds_dir, projects_dir, temp_dir]:
+    for dir_path in [
+        UPLOADS_DIR, AVATARS_DIR, LOGOS_DIR, BACKGROUNDS_DIR,
+        PROJECTS_DIR, TEMP_DIR, TTS_CACHE_DIR, SCRIPT_CACHE_DIR
+    ]:
         dir_path.mkdir(parents=True, exist_ok=True)
     
+    # Size the thread pools used by sync endpoints (anyio) and
+    # asyncio.to_thread (the loop's default executor)
+    thread_limit = int(os.getenv("ANYIO_THREADS", "100"))
+    anyio.to_thread.current_default_thread_limiter().total_tokens = thread_limit
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=thread_limit)
+    )
+    
+    # One pooled HTTP client shared by every downstream service
+    http_client = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
+        timeout=30.0
+    )
+    app.state.http = http_client
+    
     # Initialize services
     try:
         workflow_manager = WorkflowManager()
-        firecrawl_service = FirecrawlService()
-        ollama_service = OllamaService()
-        crewai_service = CrewAIService()
-        heygem_service = HeyGemService()
-        tts_service = TTSService()
+        firecrawl_service = FirecrawlService(http_client=http_client)
+        ollama_service = OllamaService(http_client=http_client)
+        crewai_service = get_crewai_service(http_client=http_client)
+        heygem_service = HeyGemService(http_client=http_client)
+        tts_service = TTSService(http_client=http_client)
         video_compositor = VideoCompositor()
         
-        print("✅ All services initialized successfully")
+        logger.info("All services initialized successfully")
     except Exception as e:
-        print(f"⚠️  Some services failed to initialize: {e}")
+        logger.warning(f"Some services failed to initialize: {e}")
+    
+    # Start the progress writer
+    _progress_queue = asyncio.Queue()
+    progress_writer = asyncio.create_task(_progress_writer_loop(_progress_queue))
+    
+    # Probe downstream services on a timer; /api/health serves the snapshot
+    app.state.health = {
+        "status": "healthy",
+        "services": {"ollama": False, "firecrawl": False, "heygem": False}
+    }
+    health_refresher = asyncio.create_task(_health_refresher(app))
     
     yield
     
     # Shutdown
-    print("🛑 Shutting down AutoStream AI Backend...")
+    logger.info("Shutting down AutoStream AI Backend...")
+    health_refresher.cancel()
+    await _progress_queue.put(None)
+    await progress_writer
+    await close_crewai_services()
+    for service in (firecrawl_service, ollama_service, heygem_service, tts_service):
+        if service is not None:
+            await service.aclose()
+    await http_client.aclose()
+    await logger.complete()
 
 
 # Create FastAPI app
@@ -90,6 +187,7 @@ app = FastAPI(
     title="AutoStream AI API",
     description="Backend API for AI-powered faceless video automation",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -103,26 +201,195 @@ app.add_middleware(
 )
 
 # Mount static files for uploaded assets
-base_dir = Path(__file__).parent.parent
-uploads_dir = base_dir / "frontend" / "public" / "uploads"
+if UPLOADS_DIR.exists():
+    app.mount("/uploads", StaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
+
+
+# ============== Helpers ==============
+
+async def _stream_upload_to(file: UploadFile, dest_dir: Path, buf_size: int = 65536) -> Path:
+    """
+    Stream an uploaded file to disk in fixed-size chunks and store it
+    under a content-addressed name in ``dest_dir``
+    
+    The data is written to a unique temporary name first and atomically
+    moved into place, so readers never see a partially written file.
+    
+    Returns:
+        Final path of the stored file
+    """
+    tmp_path = dest_dir / f".upload.{os.getpid()}.{uuid.uuid4().hex}.part"
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        async with aiofiles.open(tmp_path, "wb") as f:
+            while chunk := await file.read(buf_size):
+                digest.update(chunk)
+                await f.write(chunk)
+        
+        final_path = dest_dir / f"{digest.hexdigest()}{Path(file.filename or '').suffix.lower()}"
+        os.replace(tmp_path, final_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    
+    return final_path
+
+
+def _read_progress(progress_file: Path) -> dict:
+    """Read a video progress file (blocking, run via asyncio.to_thread)"""
+    if not progress_file.exists():
+        return {"progress": 0, "status": "not_started"}
+    
+    with open(progress_file, "rb") as f:
+        return orjson.loads(f.read())
+
+
+async def _progress_writer_loop(queue: asyncio.Queue) -> None:
+    """Persist progress updates from the queue until a None sentinel arrives"""
+    while (item := await queue.get()) is not None:
+        project_id, payload = item
+        progress_file = TEMP_DIR / f"{project_id}_progress.json"
+        tmp_file = progress_file.with_name(f".{progress_file.name}.tmp")
+        try:
+            async with aiofiles.open(tmp_file, "wb") as f:
+                await f.write(orjson.dumps(payload))
+            await aiofiles.os.replace(tmp_file, progress_file)
+        except OSError as e:
+            logger.error(f"Failed to write progress for {project_id}: {e}")
+
+
+def _report_progress(project_id: str, **fields: Any) -> None:
+    """Record the latest progress for a project and queue it for persistence"""
+    payload = VideoProgress(**fields).model_dump()
+    _progress_state[project_id] = payload
+    if _progress_queue is not None:
+        _progress_queue.put_nowait((project_id, payload))
+
+
+async def _health_refresher(app: FastAPI) -> None:
+    """Refresh app.state.health from the service probes until cancelled"""
+    async def probe(service: Any) -> bool:
+        if not service:
+            return False
+        try:
+            if inspect.iscoroutinefunction(service.is_available):
+                return await service.is_available()
+            return await asyncio.to_thread(service.is_available)
+        except Exception as e:
+            logger.warning(f"Health probe failed: {e}")
+            return False
+    
+    while True:
+        ollama, firecrawl, heygem = await asyncio.gather(
+            probe(ollama_service), probe(firecrawl_service), probe(heygem_service)
+        )
+        app.state.health = {
+            "status": "healthy",
+            "services": {"ollama": ollama, "firecrawl": firecrawl, "heygem": heygem}
+        }
+        await asyncio.sleep(HEALTH_REFRESH_INTERVAL)
+
+
+def _scan_projects(projects_dir: Path) -> list[dict]:
+    """Collect project summaries from disk (blocking, run via asyncio.to_thread)"""
+    if not projects_dir.exists():
+        return []
+    
+    # Only re-parse state files when one of them was added, removed or modified
+    state_files = []
+    for project_dir in projects_dir.iterdir():
+        state_file = project_dir / "workflow_state.json"
+        if project_dir.is_dir() and state_file.exists():
+            state_files.append((state_file, state_file.stat().st_mtime_ns))
+    signature = tuple(state_files)
+    
+    cached = _PROJECTS_CACHE.get(projects_dir)
+    if cached and cached[0] == signature:
+        return cached[1]
+    
+    projects = []
+    for state_file, _ in state_files:
+        with open(state_file, "rb") as f:
+            state = orjson.loads(f.read())
+        projects.append({
+            "id": state_file.parent.name,
+            "name": state.get("name", "Untitled"),
+            "created_at": state.get("created_at"),
+            "status": state.get("current_step")
+        })
+    
+    _PROJECTS_CACHE[projects_dir] = (signature, projects)
+    return projects
+
+
+def _scan_assets(asset_dir: Path, asset_type: str) -> list[dict]:
+    """Collect uploaded asset entries, reusing the last scan while the directory is unchanged"""
+    if not asset_dir.exists():
+        return []
+    
+    mtime = asset_dir.stat().st_mtime_ns
+    cached = _ASSETS_CACHE.get(asset_dir)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
+    assets = []
+    for file in asset_dir.iterdir():
+        if file.is_file() and not file.name.endswith(".part"):
+            assets.append({
+                "filename": file.name,
+                "url": f"/uploads/{asset_type}/{file.name}",
+                "size": file.stat().st_size
+            })
+    
+    _ASSETS_CACHE[asset_dir] = (mtime, assets)
+    return assets
+
+
+def _cache_key(*parts: Any) -> str:
+    """Build an MD5 cache key from generation inputs"""
+    return hashlib.md5("|".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def _load_cache_entry(cache_file: Path) -> Optional[dict]:
+    """Read a cached generation result, or None on a miss"""
+    if not cache_file.exists():
+        return None
+    
+    with open(cache_file, "rb") as f:
+        return orjson.loads(f.read())
+
+
+def _store_cache_entry(cache_file: Path, data: dict) -> None:
+    """Write a cached generation result atomically"""
+    tmp_file = cache_file.with_name(f".{cache_file.name}.{os.getpid()}.tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(orjson.dumps(data, default=str))
+    os.replace(tmp_file, cache_file)
+
+
+async def _cached_lookup(key: str, fetch, *args: Any) -> Any:
+    """Return a cached lookup result, refreshing it in a thread once it expires"""
+    cached = _LOOKUP_CACHE.get(key)
+    now = time.monotonic()
+    if cached and now - cached[0] < LOOKUP_CACHE_TTL:
+        return cached[1]
+    
+    value = await asyncio.to_thread(fetch, *args)
+    _LOOKUP_CACHE[key] = (now, value)
+    return value
 
-if uploads_dir.exists():
-    app.mount("/uploads", StaticFiles(directory=str(uploads_dir)), name="uploads")
+
+def _scan_lock(directory: Path) -> asyncio.Lock:
+    """Get the lock serializing cache rebuilds for a known directory"""
+    return _SCAN_LOCKS[directory]
 
 
 # ============== Health & Status Endpoints ==============
 
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "services": {
-            "ollama": ollama_service.is_available() if ollama_service else False,
-            "firecrawl": firecrawl_service.is_available() if firecrawl_service else False,
-            "heygem": heygem_service.is_available() if heygem_service else False,
-        }
-    }
+    """Health check endpoint (served from the snapshot kept by _health_refresher)"""
+    return app.state.health
 
 
 @app.get("/api/workflow/state")
@@ -164,10 +431,13 @@ async def select_trend(trend: TrendItem):
     if not workflow_manager:
         raise HTTPException(status_code=503, detail="Services not initialized")
     
-    workflow_manager.update_step("trends", {"selected": trend.dict()})
+    workflow_manager.update_step("trends", {"selected": trend.model_dump(mode="json")})
     workflow_manager.next_step()
     
-    return {"status": "success", "next_step": workflow_manager.get_current_step()}
+    return Response(
+        content=_NEXT_STEP_RESPONSES[workflow_manager.get_current_step()],
+        media_type="application/json"
+    )
 
 
 # ============== Script Generation Endpoints ==============
@@ -182,27 +452,44 @@ async def generate_script(request: ScriptGenerationRequest):
     
     try:
         # Get selected trend from workflow state
-        state = workflow_manager.get_state()
-        selected_trend = state.get("trends", {}).get("selected")
+        state = workflow_manager.current_state
+        selected_trend = state.trends.selected if state else None
         
         if not selected_trend:
             raise HTTPException(status_code=400, detail="No trend selected")
         
+        use_crewai = bool(request.use_crewai and crewai_service)
+        topic = selected_trend.title
+        description = selected_trend.description or ""
+        tone = request.tone or "professional"
+        length = request.length or "short"
+        
+        # Reuse a previous generation for identical inputs
+        model = ollama_service.model if ollama_service else ""
+        cache_key = _cache_key(topic, description, tone, length, use_crewai, model)
+        cache_file = SCRIPT_CACHE_DIR / f"{cache_key}.json"
+        script_data = await asyncio.to_thread(_load_cache_entry, cache_file)
+        
         # Generate script
-        if request.use_crewai and crewai_service:
-            script_data = await crewai_service.generate_script(
-                topic=selected_trend.get("title", ""),
-                description=selected_trend.get("description", ""),
-                tone=request.tone or "professional",
-                length=request.length or "short"
-            )
-        else:
-            script_data = await ollama_service.generate_script(
-                topic=selected_trend.get("title", ""),
-                description=selected_trend.get("description", ""),
-                tone=request.tone or "professional",
-                length=request.length or "short"
-            )
+        if script_data is None:
+            if use_crewai:
+                script_data = await crewai_service.generate_script(
+                    topic=topic,
+                    description=description,
+                    tone=tone,
+                    length=length
+                )
+            else:
+                script_data = await ollama_service.generate_script(
+                    topic=topic,
+                    description=description,
+                    tone=tone,
+                    length=length
+                )
+            
+            # Don't pin fallback output when the LLM was unreachable
+            if not script_data.get("fallback") and script_data.get("generation_method") != "fallback":
+                await asyncio.to_thread(_store_cache_entry, cache_file, script_data)
         
         # Update workflow state
         workflow_manager.update_step("script", {
@@ -242,7 +529,10 @@ async def approve_script():
         raise HTTPException(status_code=503, detail="Services not initialized")
     
     workflow_manager.next_step()
-    return {"status": "success", "next_step": workflow_manager.get_current_step()}
+    return Response(
+        content=_NEXT_STEP_RESPONSES[workflow_manager.get_current_step()],
+        media_type="application/json"
+    )
 
 
 # ============== Voice & Audio Endpoints ==============
@@ -253,7 +543,7 @@ async def get_available_voices():
     if not tts_service:
         raise HTTPException(status_code=503, detail="TTS service not available")
     
-    return tts_service.get_available_voices()
+    return await _cached_lookup("voices", tts_service.get_available_voices)
 
 
 @app.post("/api/audio/generate", response_model=dict)
@@ -264,19 +554,30 @@ async def generate_audio(request: TTSRequest):
     
     try:
         # Get script from workflow state
-        state = workflow_manager.get_state()
-        script_content = state.get("script", {}).get("content")
+        state = workflow_manager.current_state
+        script_content = state.script.content if state else None
         
         if not script_content:
             raise HTTPException(status_code=400, detail="No script content available")
         
-        # Generate audio
-        audio_data = await tts_service.generate_audio(
-            text=script_content,
-            voice_id=request.voice_id,
-            stability=request.stability or 0.5,
-            similarity_boost=request.similarity_boost or 0.75
-        )
+        stability = request.stability or 0.5
+        similarity_boost = request.similarity_boost or 0.75
+        
+        # Reuse previously generated audio for identical text and voice settings
+        cache_key = _cache_key(script_content, request.voice_id, stability, similarity_boost)
+        cache_file = TTS_CACHE_DIR / f"{cache_key}.json"
+        audio_data = await asyncio.to_thread(_load_cache_entry, cache_file)
+        
+        cached_path = audio_data.get("path") if audio_data else None
+        if not cached_path or not Path(cached_path).is_file():
+            # Generate audio
+            audio_data = await tts_service.generate_audio(
+                text=script_content,
+                voice_id=request.voice_id,
+                stability=stability,
+                similarity_boost=similarity_boost
+            )
+            await asyncio.to_thread(_store_cache_entry, cache_file, audio_data)
         
         # Update workflow state
         workflow_manager.update_step("audio", audio_data)
@@ -293,7 +594,10 @@ async def approve_audio():
         raise HTTPException(status_code=503, detail="Services not initialized")
     
     workflow_manager.next_step()
-    return {"status": "success", "next_step": workflow_manager.get_current_step()}
+    return Response(
+        content=_NEXT_STEP_RESPONSES[workflow_manager.get_current_step()],
+        media_type="application/json"
+    )
 
 
 # ============== Asset Management Endpoints ==============
@@ -301,25 +605,19 @@ async def approve_audio():
 @app.post("/api/assets/avatar")
 async def upload_avatar(file: UploadFile = File(...)):
     """Upload a custom avatar image"""
-    if not file.content_type.startswith("image/"):
+    if file.content_type not in _IMAGE_MIMES:
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    base_dir = Path(__file__).parent.parent
-    avatars_dir = base_dir / "frontend" / "public" / "uploads" / "avatars"
-    
     # Save file
-    file_path = avatars_dir / file.filename
-    content = await file.read()
-    
-    with open(file_path, "wb") as f:
-        f.write(content)
+    file_path = await _stream_upload_to(file, AVATARS_DIR)
+    _ASSETS_CACHE.pop(AVATARS_DIR, None)
     
     # Update workflow state
     workflow_manager.update_step("assets", {
         "avatar": {
             "filename": file.filename,
             "path": str(file_path),
-            "url": f"/uploads/avatars/{file.filename}"
+            "url": f"/uploads/avatars/{file_path.name}"
         }
     })
     
@@ -327,7 +625,7 @@ async def upload_avatar(file: UploadFile = File(...)):
         "status": "success",
         "avatar": {
             "filename": file.filename,
-            "url": f"/uploads/avatars/{file.filename}"
+            "url": f"/uploads/avatars/{file_path.name}"
         }
     }
 
@@ -335,25 +633,19 @@ async def upload_avatar(file: UploadFile = File(...)):
 @app.post("/api/assets/logo")
 async def upload_logo(file: UploadFile = File(...)):
     """Upload a custom logo"""
-    if not file.content_type.startswith("image/"):
+    if file.content_type not in _IMAGE_MIMES:
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    base_dir = Path(__file__).parent.parent
-    logos_dir = base_dir / "frontend" / "public" / "uploads" / "logos"
-    
     # Save file
-    file_path = logos_dir / file.filename
-    content = await file.read()
-    
-    with open(file_path, "wb") as f:
-        f.write(content)
+    file_path = await _stream_upload_to(file, LOGOS_DIR)
+    _ASSETS_CACHE.pop(LOGOS_DIR, None)
     
     # Update workflow state
     workflow_manager.update_step("assets", {
         "logo": {
             "filename": file.filename,
             "path": str(file_path),
-            "url": f"/uploads/logos/{file.filename}"
+            "url": f"/uploads/logos/{file_path.name}"
         }
     })
     
@@ -361,7 +653,7 @@ async def upload_logo(file: UploadFile = File(...)):
         "status": "success",
         "logo": {
             "filename": file.filename,
-            "url": f"/uploads/logos/{file.filename}"
+            "url": f"/uploads/logos/{file_path.name}"
         }
     }
 
@@ -369,27 +661,22 @@ async def upload_logo(file: UploadFile = File(...)):
 @app.post("/api/assets/background")
 async def upload_background(file: UploadFile = File(...)):
     """Upload a background image or video"""
-    valid_types = ["image/", "video/"]
-    if not any(file.content_type.startswith(t) for t in valid_types):
+    if file.content_type not in _BG_MIMES:
         raise HTTPException(status_code=400, detail="File must be an image or video")
     
-    base_dir = Path(__file__).parent.parent
-    backgrounds_dir = base_dir / "frontend" / "public" / "uploads" / "backgrounds"
+    background_type = "video" if file.content_type in _VIDEO_MIMES else "image"
     
     # Save file
-    file_path = backgrounds_dir / file.filename
-    content = await file.read()
-    
-    with open(file_path, "wb") as f:
-        f.write(content)
+    file_path = await _stream_upload_to(file, BACKGROUNDS_DIR)
+    _ASSETS_CACHE.pop(BACKGROUNDS_DIR, None)
     
     # Update workflow state
     workflow_manager.update_step("assets", {
         "background": {
             "filename": file.filename,
             "path": str(file_path),
-            "url": f"/uploads/backgrounds/{file.filename}",
-            "type": "video" if file.content_type.startswith("video/") else "image"
+            "url": f"/uploads/backgrounds/{file_path.name}",
+            "type": background_type
         }
     })
     
@@ -397,8 +684,8 @@ async def upload_background(file: UploadFile = File(...)):
         "status": "success",
         "background": {
             "filename": file.filename,
-            "url": f"/uploads/backgrounds/{file.filename}",
-            "type": "video" if file.content_type.startswith("video/") else "image"
+            "url": f"/uploads/backgrounds/{file_path.name}",
+            "type": background_type
         }
     }
 
@@ -406,20 +693,12 @@ async def upload_background(file: UploadFile = File(...)):
 @app.get("/api/assets/list/{asset_type}")
 async def list_assets(asset_type: str):
     """List all uploaded assets of a specific type"""
-    base_dir = Path(__file__).parent.parent
-    asset_dir = base_dir / "frontend" / "public" / "uploads" / asset_type
+    asset_dir = UPLOADS_DIR / asset_type
+    if asset_dir not in _SCAN_LOCKS:
+        raise HTTPException(status_code=404, detail=f"Unknown asset type: {asset_type}")
     
-    if not asset_dir.exists():
-        return {"assets": []}
-    
-    assets = []
-    for file in asset_dir.iterdir():
-        if file.is_file():
-            assets.append({
-                "filename": file.name,
-                "url": f"/uploads/{asset_type}/{file.name}",
-                "size": file.stat().st_size
-            })
+    async with _scan_lock(asset_dir):
+        assets = await asyncio.to_thread(_scan_assets, asset_dir, asset_type)
     
     return {"assets": assets}
 
@@ -436,63 +715,121 @@ async def generate_video(request: VideoRenderRequest, background_tasks: Backgrou
     
     try:
         # Get workflow state
-        state = workflow_manager.get_state()
+        state = workflow_manager.current_state
+        if not state:
+            raise HTTPException(status_code=400, detail="No active project")
         
-        audio_path = state.get("audio", {}).get("path")
-        avatar_path = state.get("assets", {}).get("avatar", {}).get("path")
-        logo_path = state.get("assets", {}).get("logo", {}).get("path")
-        background_path = state.get("assets", {}).get("background", {}).get("path")
-        script_content = state.get("script", {}).get("content")
+        assets = state.assets
+        audio_path = state.audio.path
+        avatar_path = assets.avatar.path if assets.avatar else None
+        logo_path = assets.logo.path if assets.logo else None
+        background_path = assets.background.path if assets.background else None
+        script_content = state.script.content
         
         if not audio_path or not avatar_path:
             raise HTTPException(status_code=400, detail="Missing audio or avatar")
         
         # Start video generation in background
-        base_dir = Path(__file__).parent.parent
-        output_dir = base_dir / "projects" / workflow_manager.get_state().get("id", "default")
+        project_id = state.id
+        output_dir = PROJECTS_DIR / project_id
         output_dir.mkdir(parents=True, exist_ok=True)
         
         output_path = output_dir / "output.mp4"
         
-        # Run video generation
-        result = await video_compositor.generate_video(
-            avatar_path=avatar_path,
-            audio_path=audio_path,
-            background_path=background_path,
-            logo_path=logo_path,
-            output_path=str(output_path),
-            script_text=script_content,
-            heygem_enabled=request.use_heygem,
-            quality=request.quality or "high"
+        if _progress_state.get(project_id, {}).get("status") == "processing":
+            raise HTTPException(status_code=409, detail="Video generation already in progress")
+        
+        _report_progress(project_id, status="processing", progress=0, current_stage="queued")
+        
+        # Render outside the request so the client can poll progress
+        url = f"/projects/{project_id}/output.mp4"
+        background_tasks.add_task(
+            _run_render,
+            project_id,
+            output_path,
+            url,
+            {
+                "avatar_path": avatar_path,
+                "audio_path": audio_path,
+                "background_path": background_path,
+                "logo_path": logo_path,
+                "output_path": str(output_path),
+                "script_text": script_content,
+                "heygem_enabled": request.use_heygem,
+                "quality": request.quality or "high"
+            }
         )
         
-        # Update workflow state
+        return {
+            "project_id": project_id,
+            "status": "processing",
+            "path": str(output_path),
+            "url": url
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate video: {str(e)}")
+
+
+async def _run_render(project_id: str, output_path: Path, url: str, render_args: dict[str, Any]) -> None:
+    """Run a video render job and record its outcome in progress and workflow state"""
+    _report_progress(project_id, status="processing", current_stage="compositing")
+    
+    # The render is as long as the voiceover (probe is cached for the render)
+    audio_info = await video_compositor.get_video_info(render_args["audio_path"])
+    audio_duration = audio_info.get("duration") or 0
+    last_report = time.monotonic()
+    
+    def on_progress(seconds: float) -> None:
+        nonlocal last_report
+        now = time.monotonic()
+        if audio_duration <= 0 or now - last_report < PROGRESS_REPORT_INTERVAL:
+            return
+        last_report = now
+        # 100 is reserved for the completed report once the file is verified
+        progress = min(int(seconds / audio_duration * 100), 99)
+        _report_progress(
+            project_id, status="processing", progress=progress, current_stage="compositing"
+        )
+    
+    try:
+        result = await video_compositor.generate_video(**render_args, progress_callback=on_progress)
+    except Exception as e:
+        logger.error(f"Video render failed for {project_id}: {e}")
+        result = {"success": False, "error": str(e)}
+    
+    if result.get("success"):
+        _report_progress(project_id, status="completed", progress=100)
+    else:
+        _report_progress(project_id, status="failed", error_message=result.get("error"))
+    
+    # The user may have switched projects while the render was running
+    state = workflow_manager.current_state
+    if not state or state.id != project_id:
+        return
+    
+    if result.get("success"):
         workflow_manager.update_step("video", {
             "output_path": str(output_path),
-            "url": f"/projects/{workflow_manager.get_state().get('id', 'default')}/output.mp4",
+            "url": url,
             "duration": result.get("duration"),
             "status": "completed"
         })
-        
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to generate video: {str(e)}")
+    else:
+        workflow_manager.update_step("video", {"status": "failed"})
 
 
 @app.get("/api/video/progress/{project_id}")
 async def get_video_progress(project_id: str):
     """Get video generation progress"""
-    base_dir = Path(__file__).parent.parent
-    progress_file = base_dir / "temp" / f"{project_id}_progress.json"
+    progress = _progress_state.get(project_id)
+    if progress is not None:
+        return progress
     
-    if not progress_file.exists():
-        return {"progress": 0, "status": "not_started"}
-    
-    import json
-    with open(progress_file, "r") as f:
-        progress_data = json.load(f)
+    progress_file = TEMP_DIR / f"{project_id}_progress.json"
     
-    return progress_data
+    return await asyncio.to_thread(_read_progress, progress_file)
 
 
 @app.post("/api/video/approve")
@@ -502,7 +839,7 @@ async def approve_video():
         raise HTTPException(status_code=503, detail="Services not initialized")
     
     workflow_manager.complete_workflow()
-    return {"status": "success", "message": "Video approved and workflow completed"}
+    return Response(content=_VIDEO_APPROVED_RESPONSE, media_type="application/json")
 
 
 # ============== Project Management Endpoints ==============
@@ -520,26 +857,8 @@ async def create_project(name: str = "New Project"):
 @app.get("/api/projects")
 async def list_projects():
     """List all projects"""
-    base_dir = Path(__file__).parent.parent
-    projects_dir = base_dir / "projects"
-    
-    if not projects_dir.exists():
-        return {"projects": []}
-    
-    projects = []
-    for project_dir in projects_dir.iterdir():
-        if project_dir.is_dir():
-            state_file = project_dir / "workflow_state.json"
-            if state_file.exists():
-                import json
-                with open(state_file, "r") as f:
-                    state = json.load(f)
-                projects.append({
-                    "id": project_dir.name,
-                    "name": state.get("name", "Untitled"),
-                    "created_at": state.get("created_at"),
-                    "status": state.get("current_step")
-                })
+    async with _scan_lock(PROJECTS_DIR):
+        projects = await asyncio.to_thread(_scan_projects, PROJECTS_DIR)
     
     return {"projects": projects}
 
@@ -552,7 +871,7 @@ async def get_ollama_models():
     if not ollama_service:
         raise HTTPException(status_code=503, detail="Ollama service not available")
     
-    return ollama_service.get_available_models()
+    return await _cached_lookup("ollama_models", ollama_service.get_available_models)
 
 
 @app.post("/api/settings/ollama/change-model")
@@ -563,15 +882,22 @@ async def change_ollama_model(model_name: str):
     
     success = ollama_service.set_model(model_name)
     if success:
+        # The model may have just been pulled
+        _LOOKUP_CACHE.pop("ollama_models", None)
         return {"status": "success", "model": model_name}
     raise HTTPException(status_code=400, detail="Failed to change model")
 
 
 if __name__ == "__main__":
+    # Production entry point; use `uvicorn main:app --reload` for development.
+    # Workflow state lives in-process, so only raise the worker count once
+    # that state is shared between processes.
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        workers=int(os.getenv("UVICORN_WORKERS", "1")),
+        loop="uvloop",
+        http="httptools",
         log_level="info"
     )
@@ -3,6 +3,11 @@
 from models.schemas import (
     WorkflowStep,
     WorkflowState,
+    TrendsState,
+    ScriptState,
+    AudioState,
+    AssetsState,
+    VideoState,
     TrendItem,
     TrendSearchRequest,
     TrendResult,
@@ -28,6 +33,11 @@ from models.schemas import (
 __all__ = [
     "WorkflowStep",
     "WorkflowState",
+    "TrendsState",
+    "ScriptState",
+    "AudioState",
+    "AssetsState",
+    "VideoState",
     "TrendItem",
     "TrendSearchRequest",
     "TrendResult",
@@ -4,11 +4,16 @@ Data validation schemas for API requests and responses
 """
 
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import datetime, timezone
 from enum import Enum
 
 
+def utc_now() -> datetime:
+    """Timezone-aware current time used for model timestamps"""
+    return datetime.now(timezone.utc)
+
+
 # ============== Workflow State Models ==============
 
 class WorkflowStep(str, Enum):
@@ -22,20 +27,6 @@ class WorkflowStep(str, Enum):
     COMPLETE = "complete"
 
 
-class WorkflowState(BaseModel):
-    """Complete workflow state model"""
-    id: str = Field(..., description="Unique project ID")
-    name: str = Field(..., description="Project name")
-    current_step: WorkflowStep = Field(default=WorkflowStep.IDLE)
-    created_at: datetime = Field(default_factory=datetime.now)
-    updated_at: datetime = Field(default_factory=datetime.now)
-    trends: Dict[str, Any] = Field(default_factory=dict)
-    script: Dict[str, Any] = Field(default_factory=dict)
-    audio: Dict[str, Any] = Field(default_factory=dict)
-    assets: Dict[str, Any] = Field(default_factory=dict)
-    video: Dict[str, Any] = Field(default_factory=dict)
-
-
 # ============== Trend Discovery Models ==============
 
 class TrendItem(BaseModel):
@@ -62,7 +53,7 @@ class TrendResult(BaseModel):
     trends: List[TrendItem]
     total_count: int
     search_query: str
-    scraped_at: datetime = Field(default_factory=datetime.now)
+    scraped_at: datetime = Field(default_factory=utc_now)
 
 
 # ============== Script Generation Models ==============
@@ -152,6 +143,72 @@ class BackgroundData(BaseModel):
     loop: bool = Field(default=True, description="Loop video background")
 
 
+# ============== Workflow Step State Models ==============
+# Extra keys are kept so service metadata (e.g. TTS engine details)
+# survives the round trip through the project state file.
+
+class TrendsState(BaseModel):
+    """State of the trend discovery step"""
+    model_config = ConfigDict(extra="allow")
+    
+    trends: List[TrendItem] = Field(default_factory=list)
+    selected: Optional[TrendItem] = None
+
+
+class ScriptState(BaseModel):
+    """State of the script step"""
+    model_config = ConfigDict(extra="allow")
+    
+    content: Optional[str] = None
+    title: Optional[str] = None
+    duration: Optional[int] = None
+    edited: bool = False
+
+
+class AudioState(BaseModel):
+    """State of the audio step"""
+    model_config = ConfigDict(extra="allow")
+    
+    path: Optional[str] = None
+    url: Optional[str] = None
+    duration: Optional[float] = None
+    format: Optional[str] = None
+    sample_rate: Optional[int] = None
+
+
+class AssetsState(BaseModel):
+    """State of the assets step"""
+    model_config = ConfigDict(extra="allow")
+    
+    avatar: Optional[AvatarData] = None
+    logo: Optional[LogoData] = None
+    background: Optional[BackgroundData] = None
+
+
+class VideoState(BaseModel):
+    """State of the video step"""
+    model_config = ConfigDict(extra="allow")
+    
+    output_path: Optional[str] = None
+    url: Optional[str] = None
+    duration: Optional[float] = None
+    status: Optional[str] = None
+
+
+class WorkflowState(BaseModel):
+    """Complete workflow state model"""
+    id: str = Field(..., description="Unique project ID")
+    name: str = Field(..., description="Project name")
+    current_step: WorkflowStep = Field(default=WorkflowStep.IDLE)
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
+    trends: TrendsState = Field(default_factory=TrendsState)
+    script: ScriptState = Field(default_factory=ScriptState)
+    audio: AudioState = Field(default_factory=AudioState)
+    assets: AssetsState = Field(default_factory=AssetsState)
+    video: VideoState = Field(default_factory=VideoState)
+
+
 # ============== Video Generation Models ==============
 
 class VideoRenderRequest(BaseModel):
@@ -2,7 +2,7 @@
 
 from services.workflow_manager import WorkflowManager
 from services.ollama_service import OllamaService
-from services.crewai_service import CrewAIService
+from services.crewai_service import CrewAIService, get_crewai_service
 from services.firecrawl_service import FirecrawlService
 from services.heygem_service import HeyGemService
 from services.tts_service import TTSService
@@ -12,6 +12,7 @@ __all__ = [
     "WorkflowManager",
     "OllamaService",
     "CrewAIService",
+    "get_crewai_service",
     "FirecrawlService",
     "HeyGemService",
     "TTSService",
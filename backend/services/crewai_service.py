@@ -4,10 +4,162 @@ Advanced agent-based script generation using CrewAI framework
 """
 
 import asyncio
-import json
-from typing import Dict, Any, Optional, List
+import time
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Mapping
 from loguru import logger
 
+import httpx
+import orjson
+
+
+# Static agent definitions shared by every service instance
+AGENT_CONFIGS = MappingProxyType({
+    "researcher": {
+        "role": "Topic Researcher",
+        "goal": "Research and gather key information about the given topic",
+        "backstory": "You are an expert researcher who specializes in finding the most interesting and relevant facts about any topic.",
+        "tools": ["web_search", "content_analysis"]
+    },
+    "scriptwriter": {
+        "role": "Viral Script Writer",
+        "goal": "Write engaging, viral-worthy video scripts",
+        "backstory": "You are a professional content creator who has written hundreds of viral videos across multiple platforms.",
+        "tools": ["script_structure", "engagement_hooks"]
+    },
+    "editor": {
+        "role": "Script Editor",
+        "goal": "Polish and refine scripts for maximum impact",
+        "backstory": "You are an Emmy-nominated editor who knows exactly what makes content compelling.",
+        "tools": ["pacing_analysis", "engagement_optimization"]
+    }
+})
+
+# Research fields gathered by the research agent, each with its own prompt
+RESEARCH_FIELDS = {
+    "key_points": "the main key points and facts (at least 5)",
+    "questions": "common questions people ask about this topic",
+    "trends": "trending aspects or recent developments",
+    "angles": "controversial or debate-worthy angles",
+    "statistics": "expert quotes or statistics if available"
+}
+
+# Prompt templates, filled per call with str.format_map
+RESEARCH_PROMPT = """You are a research expert.
+TOPIC: {topic}
+CONTEXT: {description}
+
+List {field}.
+Return ONLY a JSON array of strings."""
+
+SCRIPT_PROMPT = """You are an expert viral video script writer.
+
+TOPIC: {topic}
+TONE: {tone_guide}
+TARGET WORDS: {min_words}-{max_words}
+
+RESEARCH DATA:
+{research_json}
+
+Write a compelling video script that:
+1. Opens with a HOOK (attention-grabbing first 3 seconds)
+2. Delivers VALUE with the research points
+3. Has natural pacing with [PAUSE] markers
+4. Ends with a clear CTA
+
+Format:
+TITLE: <creative title>
+SCRIPT: <full script with [PAUSE] markers>"""
+
+EDITOR_PROMPT = """You are a professional video editor and script polisher.
+
+CURRENT SCRIPT:
+Title: {title}
+Content: {content}
+
+TARGET TONE: {target_tone}
+
+Review and improve this script:
+1. Fix awkward phrasing
+2. Improve flow and transitions
+3. Enhance engagement elements
+4. Ensure consistent tone
+5. Optimize for spoken delivery
+
+Return ONLY the improved script content (no explanations):"""
+
+CRITIQUE_PROMPT = """You are a professional video editor and script polisher.
+
+CURRENT SCRIPT:
+Title: {title}
+Content: {content}
+
+TARGET TONE: {target_tone}
+
+Identify the weakest section of this script and rewrite it.
+Keep everything else as it is, including the [PAUSE] markers.
+
+Return ONLY the full improved script content (no explanations):"""
+
+SINGLE_SHOT_PROMPT = """You are a team of three: a research expert, a viral video
+script writer and a professional script editor.
+
+TOPIC: {topic}
+CONTEXT: {description}
+TONE: {tone_guide}
+TARGET WORDS: {min_words}-{max_words}
+
+Work through three stages and label each one exactly as shown:
+
+===RESEARCH===
+5 key points and facts about the topic, one per line.
+
+===SCRIPT===
+TITLE: <creative title>
+SCRIPT: <script that opens with a HOOK, delivers VALUE with the research points,
+has natural pacing with [PAUSE] markers and ends with a clear CTA>
+
+===EDIT===
+The script again, polished for flow, engagement, consistent tone and spoken
+delivery. Script content only, no title and no explanations."""
+
+# Target word range per script length
+LENGTH_MAP = MappingProxyType({
+    "short": (100, 150),
+    "medium": (150, 250),
+    "long": (250, 400)
+})
+
+# Target word count per script length for fallback scripts
+FALLBACK_LENGTH_MAP = MappingProxyType({
+    "short": 100,
+    "medium": 200,
+    "long": 350
+})
+
+TONE_INSTRUCTIONS = MappingProxyType({
+    "professional": "Professional, informative, authoritative",
+    "casual": "Casual, friendly, conversational",
+    "funny": "Humorous, witty, entertaining",
+    "dramatic": "Suspenseful, emotional, engaging",
+    "inspirational": "Motivational, uplifting, positive"
+})
+
+# Output token budget per target word (covers [PAUSE] markers and the title)
+TOKENS_PER_WORD = 2.0
+
+# Output token budget for each research field list
+RESEARCH_NUM_PREDICT = 300
+
+# Bounded LRU cache of research results, keyed on normalized topic/context
+RESEARCH_CACHE_SIZE = 512
+RESEARCH_CACHE_TTL = 3600.0
+
+# Shared service instances, one per Ollama host
+_SERVICE_POOL: Dict[str, "CrewAIService"] = {}
+
 
 class CrewAIService:
     """
@@ -15,17 +167,55 @@ class CrewAIService:
     Uses specialized agents for research, writing, and editing
     """
     
-    def __init__(self, ollama_host: str = "http://localhost:11434"):
+    __slots__ = (
+        "ollama_host",
+        "model",
+        "_owns_client",
+        "http_client",
+        "agent_configs",
+        "_research_cache"
+    )
+    
+    def __init__(
+        self,
+        ollama_host: str = "http://localhost:11434",
+        model: str = "llama3",
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
         """
         Initialize the CrewAI service
         
         Args:
             ollama_host: Ollama server host for LLM capabilities
+            model: Ollama model used by all agents (the default llama3 tag
+                is the 4-bit quantized 8B instruct model)
+            http_client: Shared HTTP client (a dedicated one is created if omitted)
         """
         self.ollama_host = ollama_host
+        self.model = model
+        self._owns_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(90.0, connect=10.0),
+            limits=httpx.Limits(
+                max_keepalive_connections=40,
+                max_connections=100,
+                keepalive_expiry=30.0
+            )
+        )
         self.agent_configs = self._load_agent_configs()
+        self._research_cache: OrderedDict[tuple, tuple[float, Dict[str, Any]]] = OrderedDict()
         logger.info("CrewAI Service initialized")
     
+    async def aclose(self) -> None:
+        """Close the HTTP client if this service created it"""
+        if self._owns_client:
+            await self.http_client.aclose()
+    
+    def invalidate(self) -> None:
+        """Drop all cached research results"""
+        self._research_cache.clear()
+    
     def is_available(self) -> bool:
         """
         Check if CrewAI service is available
@@ -37,40 +227,22 @@ class CrewAIService:
         # by falling back to simpler implementations
         return True
     
-    def _load_agent_configs(self) -> Dict[str, Any]:
+    def _load_agent_configs(self) -> Mapping[str, Any]:
         """
         Load agent configurations
         
         Returns:
             Dictionary of agent configurations
         """
-        return {
-            "researcher": {
-                "role": "Topic Researcher",
-                "goal": "Research and gather key information about the given topic",
-                "backstory": "You are an expert researcher who specializes in finding the most interesting and relevant facts about any topic.",
-                "tools": ["web_search", "content_analysis"]
-            },
-            "scriptwriter": {
-                "role": "Viral Script Writer",
-                "goal": "Write engaging, viral-worthy video scripts",
-                "backstory": "You are a professional content creator who has written hundreds of viral videos across multiple platforms.",
-                "tools": ["script_structure", "engagement_hooks"]
-            },
-            "editor": {
-                "role": "Script Editor",
-                "goal": "Polish and refine scripts for maximum impact",
-                "backstory": "You are an Emmy-nominated editor who knows exactly what makes content compelling.",
-                "tools": ["pacing_analysis", "engagement_optimization"]
-            }
-        }
+        return AGENT_CONFIGS
     
     async def generate_script(
         self,
         topic: str,
         description: str = "",
         tone: str = "professional",
-        length: str = "short"
+        length: str = "short",
+        token_queue: Optional[asyncio.Queue] = None
     ) -> Dict[str, Any]:
         """
         Generate a script using CrewAI multi-agent approach
@@ -80,25 +252,35 @@ class CrewAIService:
             description: Additional context/description
             tone: Script tone
             length: Script length
+            token_queue: Optional queue that receives writer and editor output
+                as it streams from Ollama
             
         Returns:
             Dictionary containing generated and refined script
         """
         try:
-            # Step 1: Research Phase
-            research_data = await self._run_research_agent(topic, description)
-            
-            # Step 2: Script Writing Phase
-            initial_script = await self._run_scriptwriter_agent(
-                topic, research_data, tone, length
-            )
-            
-            # Step 3: Editing Phase
-            final_script = await self._run_editor_agent(initial_script, tone)
+            if length == "short":
+                # Short scripts are small enough for one combined generation
+                research_data, final_script = await self._run_single_shot(
+                    topic, description, tone, length, token_queue
+                )
+            else:
+                # Step 1: Research Phase
+                research_data = await self._run_research_agent(topic, description)
+                
+                # Step 2: Script Writing Phase
+                initial_script = await self._run_scriptwriter_agent(
+                    topic, research_data, tone, length, token_queue
+                )
+                
+                # Step 3: Editing Phase
+                final_script = await self._run_editor_agent(
+                    initial_script, tone, length, token_queue
+                )
             
-            # Calculate metrics
+            # Calculate metrics (150 words per minute)
             word_count = len(final_script["content"].split())
-            duration_estimate = int((word_count / 150) * 60)
+            duration_estimate = word_count * 60 // 150
             
             return {
                 "title": final_script["title"],
@@ -113,10 +295,79 @@ class CrewAIService:
             }
             
         except Exception as e:
-            logger.error(f"CrewAI script generation failed: {e}")
+            logger.opt(exception=e).error("CrewAI script generation failed")
             # Fallback to basic generation
             return await self._fallback_generation(topic, tone, length)
     
+    async def _run_single_shot(
+        self,
+        topic: str,
+        description: str,
+        tone: str,
+        length: str,
+        token_queue: Optional[asyncio.Queue] = None
+    ) -> tuple:
+        """
+        Run research, writing and editing as a single Ollama generation
+        
+        Args:
+            topic: Topic for the script
+            description: Additional context
+            tone: Script tone
+            length: Script length
+            token_queue: Optional queue that receives generated text as it streams
+            
+        Returns:
+            Tuple of (research data dictionary, edited script dictionary)
+        """
+        min_words, max_words = LENGTH_MAP.get(length, LENGTH_MAP["short"])
+        
+        prompt = SINGLE_SHOT_PROMPT.format_map({
+            "topic": topic,
+            "description": description,
+            "tone_guide": TONE_INSTRUCTIONS.get(tone, TONE_INSTRUCTIONS["professional"]),
+            "min_words": min_words,
+            "max_words": max_words
+        })
+        
+        text = await self._post_generate(
+            prompt,
+            {
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "num_predict": RESEARCH_NUM_PREDICT + int(2 * max_words * TOKENS_PER_WORD)
+            },
+            timeout=90.0,
+            token_queue=token_queue
+        )
+        if text is None:
+            raise RuntimeError("Ollama returned an error for the single-shot prompt")
+        
+        research_at = text.find("===RESEARCH===")
+        script_at = text.find("===SCRIPT===")
+        edit_at = text.find("===EDIT===")
+        
+        research_text = ""
+        if research_at != -1:
+            research_end = script_at if script_at > research_at else len(text)
+            research_text = text[research_at + len("===RESEARCH==="):research_end]
+        
+        script_text = text
+        if script_at != -1:
+            script_end = edit_at if edit_at > script_at else len(text)
+            script_text = text[script_at + len("===SCRIPT==="):script_end]
+        script = self._parse_script_output(script_text, topic)
+        
+        if edit_at != -1:
+            edited = text[edit_at + len("===EDIT==="):].strip()
+            if edited:
+                script = {**script, "content": edited, "edited": True}
+        
+        research_data = {field: [] for field in RESEARCH_FIELDS}
+        research_data["key_points"] = self._parse_research_list(research_text)
+        
+        return research_data, script
+    
     async def _run_research_agent(
         self,
         topic: str,
@@ -132,71 +383,125 @@ class CrewAIService:
         Returns:
             Research data dictionary
         """
-        # Simulate research using Ollama
-        research_prompt = f"""You are a research expert. Research the following topic and provide key information:
-
-TOPIC: {topic}
-CONTEXT: {description}
-
-Provide:
-1. Main key points and facts (at least 5)
-2. Common questions people ask about this topic
-3. Trending aspects or recent developments
-4. Controversial or debate-worthy angles
-5. Expert quotes or statistics if available
-
-Format as JSON with keys: key_points, questions, trends, angles, statistics"""
-
-        try:
-            import httpx
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.ollama_host}/api/generate",
-                    json={
-                        "model": "llama3",
-                        "prompt": research_prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.7,
-                            "max_tokens": 1500
-                        }
-                    },
+        cache_key = (topic.strip().lower(), description.strip().lower())
+        cached = self._research_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < RESEARCH_CACHE_TTL:
+            self._research_cache.move_to_end(cache_key)
+            return dict(cached[1])
+        
+        # Each research field is an independent prompt, so they run concurrently
+        fields = list(RESEARCH_FIELDS)
+        results = await asyncio.gather(
+            *(
+                self._post_generate(
+                    RESEARCH_PROMPT.format_map({
+                        "topic": topic,
+                        "description": description,
+                        "field": RESEARCH_FIELDS[field]
+                    }),
+                    {"temperature": 0.7, "num_predict": RESEARCH_NUM_PREDICT},
                     timeout=60.0
                 )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    text = data.get("response", "")
-                    
-                    # Try to parse JSON
-                    try:
-                        # Find JSON in response
-                        if "```json" in text:
-                            json_text = text.split("```json")[1].split("```")[0]
-                        elif "{" in text and "}" in text:
-                            start = text.find("{")
-                            end = text.rfind("}") + 1
-                            json_text = text[start:end]
-                        else:
-                            json_text = "{}"
-                        
-                        return json.loads(json_text)
-                    except:
-                        # Return structured fallback
-                        return self._structure_research_data(text)
-                else:
-                    return self._empty_research_data()
-        except Exception as e:
-            logger.error(f"Research agent error: {e}")
+                for field in fields
+            ),
+            return_exceptions=True
+        )
+        
+        research_data = {}
+        for field, result in zip(fields, results):
+            if isinstance(result, Exception):
+                logger.error("Research agent error ({}): {}", field, result)
+                continue
+            if result is not None:
+                research_data[field] = self._parse_research_list(result)
+        
+        if not research_data:
             return self._empty_research_data()
+        
+        for field in fields:
+            research_data.setdefault(field, [])
+        
+        self._research_cache[cache_key] = (time.monotonic(), research_data)
+        self._research_cache.move_to_end(cache_key)
+        while len(self._research_cache) > RESEARCH_CACHE_SIZE:
+            self._research_cache.popitem(last=False)
+        
+        return dict(research_data)
+    
+    async def _post_generate(
+        self,
+        prompt: str,
+        options: Dict[str, Any],
+        timeout: float,
+        token_queue: Optional[asyncio.Queue] = None
+    ) -> Optional[str]:
+        """
+        Send a single generation request to Ollama and stream the reply
+        
+        Args:
+            prompt: Prompt text
+            options: Ollama sampling options
+            timeout: Request timeout in seconds
+            token_queue: Optional queue that receives each text chunk as it arrives
+            
+        Returns:
+            Generated text, or None if Ollama returned an error status
+        """
+        parts = []
+        async with self.http_client.stream(
+            "POST",
+            f"{self.ollama_host}/api/generate",
+            json={
+                "model": self.model,
+                "prompt": prompt,
+                "stream": True,
+                "options": options
+            },
+            timeout=timeout
+        ) as response:
+            if response.status_code != 200:
+                return None
+            
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = orjson.loads(line)
+                text = chunk.get("response", "")
+                if text:
+                    parts.append(text)
+                    if token_queue is not None:
+                        await token_queue.put(text)
+                if chunk.get("done"):
+                    break
+        
+        return "".join(parts)
+    
+    def _parse_research_list(self, text: str) -> List[str]:
+        """Parse a research agent reply into a list of strings"""
+        start = text.find("[")
+        end = text.rfind("]") + 1
+        if start != -1 and end > start:
+            try:
+                items = orjson.loads(text[start:end])
+                if isinstance(items, list):
+                    return [str(item) for item in items]
+            except orjson.JSONDecodeError:
+                pass
+        
+        # Fall back to one item per non-empty line, minus list markers
+        return [
+            line.strip().lstrip("-*0123456789.) ").strip()
+            for line in text.splitlines()
+            if line.strip()
+        ]
     
     async def _run_scriptwriter_agent(
         self,
         topic: str,
         research_data: Dict[str, Any],
         tone: str,
-        length: str
+        length: str,
+        token_queue: Optional[asyncio.Queue] = None
     ) -> Dict[str, Any]:
         """
         Run the scriptwriter agent to create initial script
@@ -206,81 +511,49 @@ Format as JSON with keys: key_points, questions, trends, angles, statistics"""
             research_data: Research information
             tone: Script tone
             length: Script length
+            token_queue: Optional queue that receives generated text as it streams
             
         Returns:
             Initial script dictionary
         """
-        # Map length to word count
-        length_map = {
-            "short": (100, 150),
-            "medium": (150, 250),
-            "long": (250, 400)
-        }
-        
-        min_words, max_words = length_map.get(length, (100, 150))
-        
-        tone_instructions = {
-            "professional": "Professional, informative, authoritative",
-            "casual": "Casual, friendly, conversational",
-            "funny": "Humorous, witty, entertaining",
-            "dramatic": "Suspenseful, emotional, engaging",
-            "inspirational": "Motivational, uplifting, positive"
-        }
+        min_words, max_words = LENGTH_MAP.get(length, LENGTH_MAP["short"])
+        tone_guide = TONE_INSTRUCTIONS.get(tone, TONE_INSTRUCTIONS["professional"])
         
-        tone_guide = tone_instructions.get(tone, tone_instructions["professional"])
+        script_prompt = SCRIPT_PROMPT.format_map({
+            "topic": topic,
+            "tone_guide": tone_guide,
+            "min_words": min_words,
+            "max_words": max_words,
+            "research_json": orjson.dumps(research_data, option=orjson.OPT_INDENT_2).decode()
+        })
         
-        script_prompt = f"""You are an expert viral video script writer.
-
-TOPIC: {topic}
-TONE: {tone_guide}
-TARGET WORDS: {min_words}-{max_words}
-
-RESEARCH DATA:
-{json.dumps(research_data, indent=2)}
-
-Write a compelling video script that:
-1. Opens with a HOOK (attention-grabbing first 3 seconds)
-2. Delivers VALUE with the research points
-3. Has natural pacing with [PAUSE] markers
-4. Ends with a clear CTA
-
-Format:
-TITLE: <creative title>
-SCRIPT: <full script with [PAUSE] markers>"""
-
         try:
-            import httpx
+            text = await self._post_generate(
+                script_prompt,
+                {
+                    "temperature": 0.8,
+                    "top_p": 0.9,
+                    "num_predict": int(max_words * TOKENS_PER_WORD)
+                },
+                timeout=90.0,
+                token_queue=token_queue
+            )
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.ollama_host}/api/generate",
-                    json={
-                        "model": "llama3",
-                        "prompt": script_prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.8,
-                            "top_p": 0.9,
-                            "max_tokens": 1500
-                        }
-                    },
-                    timeout=90.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    text = data.get("response", "")
-                    return self._parse_script_output(text, topic)
-                else:
-                    return self._empty_script(topic)
+            if text is not None:
+                return self._parse_script_output(text, topic)
+            else:
+                return self._empty_script(topic)
         except Exception as e:
-            logger.error(f"Scriptwriter agent error: {e}")
+            logger.error("Scriptwriter agent error: {}", e)
             return self._empty_script(topic)
     
     async def _run_editor_agent(
         self,
         script_data: Dict[str, Any],
-        target_tone: str
+        target_tone: str,
+        length: str = "short",
+        token_queue: Optional[asyncio.Queue] = None,
+        template: str = EDITOR_PROMPT
     ) -> Dict[str, Any]:
         """
         Run the editor agent to polish the script
@@ -288,61 +561,44 @@ SCRIPT: <full script with [PAUSE] markers>"""
         Args:
             script_data: Current script data
             target_tone: Target tone for the script
+            length: Script length, used to cap the output tokens
+            token_queue: Optional queue that receives generated text as it streams
+            template: Editor prompt template (title, content and target_tone fields)
             
         Returns:
             Edited script dictionary
         """
-        editor_prompt = f"""You are a professional video editor and script polisher.
-
-CURRENT SCRIPT:
-Title: {script_data.get('title', '')}
-Content: {script_data.get('content', '')}
-
-TARGET TONE: {target_tone}
-
-Review and improve this script:
-1. Fix awkward phrasing
-2. Improve flow and transitions
-3. Enhance engagement elements
-4. Ensure consistent tone
-5. Optimize for spoken delivery
-
-Return ONLY the improved script content (no explanations):"""
-
+        max_words = LENGTH_MAP.get(length, LENGTH_MAP["short"])[1]
+        title = script_data.get("title", "Edited Script")
+        
+        editor_prompt = template.format_map({
+            "title": title,
+            "content": script_data.get("content", ""),
+            "target_tone": target_tone
+        })
+        
         try:
-            import httpx
+            text = await self._post_generate(
+                editor_prompt,
+                {
+                    "temperature": 0.6,
+                    "num_predict": int(max_words * TOKENS_PER_WORD)
+                },
+                timeout=60.0,
+                token_queue=token_queue
+            )
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.ollama_host}/api/generate",
-                    json={
-                        "model": "llama3",
-                        "prompt": editor_prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.6,
-                            "max_tokens": 1500
-                        }
-                    },
-                    timeout=60.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    edited_content = data.get("response", "").strip()
-                    
-                    # Preserve the title
-                    title = script_data.get("title", "Edited Script")
-                    
-                    return {
-                        "title": title,
-                        "content": edited_content,
-                        "edited": True
-                    }
-                else:
-                    return script_data
+            if text is not None:
+                # Preserve the title
+                return {
+                    "title": title,
+                    "content": text.strip(),
+                    "edited": True
+                }
+            else:
+                return script_data
         except Exception as e:
-            logger.error(f"Editor agent error: {e}")
+            logger.error("Editor agent error: {}", e)
             return script_data
     
     async def generate_with_workflow(
@@ -350,16 +606,27 @@ Return ONLY the improved script content (no explanations):"""
         topic: str,
         niche: str,
         goals: List[str],
-        max_iterations: int = 3
+        max_iterations: int = 3,
+        variants: int = 3,
+        variant_timeout: float = 180.0
     ) -> Dict[str, Any]:
         """
         Run a complete CrewAI workflow with multiple iterations
         
+        The first iteration generates independent script variants concurrently
+        and keeps the best one (Ollama only serves them in parallel when started
+        with OLLAMA_NUM_PARALLEL > 1). Each further iteration sends the current
+        script back to the editor with a critique prompt, reusing the research
+        from the first iteration, and stops early once edits stop changing it.
+        
         Args:
             topic: Main topic
             niche: Content niche/category
             goals: List of goals for the script
-            max_iterations: Maximum refinement iterations
+            max_iterations: Maximum iterations, including the initial generation
+            variants: Number of script variants generated in the first iteration
+            variant_timeout: Seconds to wait for the variants before cancelling
+                the unfinished ones
             
         Returns:
             Final script with workflow metadata
@@ -370,25 +637,61 @@ Return ONLY the improved script content (no explanations):"""
             "workflow_status": "completed"
         }
         
-        # Initial generation
-        script = await self.generate_script(topic, f"Niche: {niche}")
+        # Generate the variants concurrently within one time budget and keep
+        # the best finished one; stragglers are cancelled
+        tasks = [
+            asyncio.create_task(
+                self.generate_script(topic, f"Niche: {niche}; variant {i + 1}")
+            )
+            for i in range(max(variants, 1))
+        ]
+        done, pending = await asyncio.wait(tasks, timeout=variant_timeout)
+        for task in pending:
+            task.cancel()
+        
+        scripts = [
+            task.result() for task in done
+            if not task.cancelled() and task.exception() is None
+        ]
+        if pending:
+            logger.warning(
+                "{} script variant(s) exceeded {}s and were cancelled",
+                len(pending), variant_timeout
+            )
+        if not scripts:
+            scripts = [await self._fallback_generation(topic, "professional", "short")]
+        script = max(scripts, key=self._score_script)
+        previous = script.get("content", "")
+        
         workflow_results["iterations"].append({
             "iteration": 1,
-            "script_length": len(script.get("content", "")),
-            "changes": "Initial generation"
+            "script_length": len(previous),
+            "changes": f"Initial generation (best of {len(scripts)} variants)"
         })
         
-        # Iterative refinement (simplified)
+        # Critique-driven refinement of the chosen script
+        tone = script.get("tone_used", "professional")
         for i in range(1, max_iterations):
-            # In a full implementation, this would involve
-            # agent-to-agent communication and feedback loops
-            await asyncio.sleep(0.1)  # Simulate processing
+            edited = await self._run_editor_agent(
+                script, tone, template=CRITIQUE_PROMPT
+            )
+            content = edited.get("content", "")
+            if not content or SequenceMatcher(None, previous, content).ratio() >= 0.98:
+                break
             
+            word_count = len(content.split())
+            script = {
+                **script,
+                "content": content,
+                "word_count": word_count,
+                "duration_estimate": word_count * 60 // 150
+            }
             workflow_results["iterations"].append({
                 "iteration": i + 1,
-                "script_length": len(script.get("content", "")),
+                "script_length": len(content),
                 "changes": "Refinement pass"
             })
+            previous = content
         
         workflow_results["final_script"] = script
         
@@ -397,20 +700,28 @@ Return ONLY the improved script content (no explanations):"""
             "workflow": workflow_results
         }
     
+    def _score_script(self, script: Dict[str, Any]) -> tuple:
+        """Rank a generated script: agent output first, then closeness to 125 words"""
+        return (
+            script.get("generation_method") == "crewai",
+            -abs(script.get("word_count", 0) - 125)
+        )
+    
     def _parse_script_output(self, raw_output: str, default_topic: str) -> Dict[str, Any]:
         """Parse raw script output into structured data"""
         title = default_topic
         content = raw_output
         
-        if "TITLE:" in raw_output:
-            parts = raw_output.split("TITLE:")
-            if len(parts) > 1:
-                remaining = parts[1]
-                if "SCRIPT:" in remaining:
-                    title = remaining.split("SCRIPT:")[0].strip()
-                    content = remaining.split("SCRIPT:")[1].strip()
-                else:
-                    title = remaining.strip()
+        # Locate both markers with one forward scan, slicing once per field
+        title_at = raw_output.find("TITLE:")
+        if title_at != -1:
+            title_at += len("TITLE:")
+            script_at = raw_output.find("SCRIPT:", title_at)
+            if script_at != -1:
+                title = raw_output[title_at:script_at].strip()
+                content = raw_output[script_at + len("SCRIPT:"):].strip()
+            else:
+                title = raw_output[title_at:].strip()
         
         return {
             "title": title,
@@ -418,16 +729,6 @@ Return ONLY the improved script content (no explanations):"""
             "raw": raw_output
         }
     
-    def _structure_research_data(self, text: str) -> Dict[str, Any]:
-        """Structure raw text into research data"""
-        return {
-            "key_points": text[:500].split(".")[:5],
-            "questions": [],
-            "trends": [],
-            "angles": [],
-            "raw_text": text
-        }
-    
     def _empty_research_data(self) -> Dict[str, Any]:
         """Return empty research data structure"""
         return {
@@ -453,13 +754,7 @@ Return ONLY the improved script content (no explanations):"""
         length: str
     ) -> Dict[str, Any]:
         """Fallback script generation when CrewAI fails"""
-        length_map = {
-            "short": 100,
-            "medium": 200,
-            "long": 350
-        }
-        
-        target_words = length_map.get(length, 100)
+        target_words = FALLBACK_LENGTH_MAP.get(length, 100)
         
         fallback_content = f"""[PAUSE]
 
@@ -483,12 +778,43 @@ Don't forget to like and subscribe for more content!
 
 [PAUSE]"""
         
+        word_count = len(fallback_content.split())
+        
         return {
             "title": f"{topic.title()} - {tone.title()} Script",
             "content": fallback_content,
-            "duration_estimate": int((len(fallback_content.split()) / 150) * 60),
-            "word_count": len(fallback_content.split()),
+            "duration_estimate": word_count * 60 // 150,
+            "word_count": word_count,
             "key_points": [f"Introduction to {topic}", "Key insights", "Conclusion"],
             "tone_used": tone,
             "generation_method": "fallback"
         }
+
+
+def get_crewai_service(
+    ollama_host: str = "http://localhost:11434",
+    http_client: Optional[httpx.AsyncClient] = None
+) -> CrewAIService:
+    """
+    Get the shared CrewAI service for an Ollama host, creating it on first use
+    
+    Args:
+        ollama_host: Ollama server host for LLM capabilities
+        http_client: Shared HTTP client, used only when the service is created
+        
+    Returns:
+        The pooled CrewAIService instance
+    """
+    service = _SERVICE_POOL.get(ollama_host)
+    if service is None:
+        service = CrewAIService(ollama_host, http_client=http_client)
+        _SERVICE_POOL[ollama_host] = service
+    return service
+
+
+async def close_crewai_services() -> None:
+    """Close and forget all pooled CrewAI services"""
+    services = list(_SERVICE_POOL.values())
+    _SERVICE_POOL.clear()
+    for service in services:
+        await service.aclose()
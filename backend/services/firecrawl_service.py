@@ -4,13 +4,83 @@ Web scraping and trending topic discovery
 """
 
 import asyncio
-import json
+import random
 import re
+import time
+from collections import OrderedDict
+from itertools import chain, islice
+from urllib.parse import parse_qsl, quote_plus, urlencode, urlsplit
 from typing import Dict, Any, Optional, List
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from loguru import logger
 
 import httpx
+import orjson
+from selectolax.lexbor import LexborHTMLParser
+
+
+# Maximum number of title matches parsed from one search page
+MAX_PARSED_RESULTS = 10
+
+# Bounded LRU cache of successful scrapes (search pages and Firecrawl URLs)
+SCRAPE_CACHE_SIZE = 1024
+SCRAPE_CACHE_TTL = 300.0
+
+# Search page retries on transient failures, with exponential backoff
+SCRAPE_RETRY_ATTEMPTS = 3
+SCRAPE_RETRY_BASE_DELAY = 0.2
+SCRAPE_RETRY_MAX_DELAY = 2.0
+# Longest Retry-After wait honoured before giving up on a source
+SCRAPE_RETRY_AFTER_MAX = 10.0
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Seconds an availability check result is reused before probing again
+AVAILABILITY_TTL = 30.0
+
+# Title keywords that mark a content theme
+THEME_KEYWORDS = (
+    ("how", "How-to content"),
+    ("top", "List-style content"),
+    ("why", "Explanation content"),
+    ("review", "Review content")
+)
+
+# Headers for request bodies serialized with orjson
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Translation table that strips thousands separators from view counts
+THOUSANDS_SEPARATORS = str.maketrans("", "", ",")
+
+# Title pattern for search pages that embed their results as JSON
+JSON_TITLE_RE = re.compile(r'"title":"([^"]+)"')
+
+# Selector keys in source_configs that point at result titles, by preference
+TITLE_SELECTOR_KEYS = ("title", "headlines", "trends", "trending")
+
+# Opening lines for video ideas; the first one is used as the hook
+HOOK_TEMPLATES = (
+    "You won't believe what I discovered about {topic}...",
+    "This changed everything I knew about {topic}.",
+    "If you're interested in {topic}, you need to hear this.",
+    "The truth about {topic} might surprise you."
+)
+
+# Sources whose search pages embed result titles as JSON
+JSON_TITLE_SOURCES = {
+    "youtube": {
+        "min_title_length": 11,
+        "description": "Video about {query}",
+        "url": "https://www.youtube.com/results?search_query={encoded_query}",
+        "engagement": "views"
+    },
+    "reddit": {
+        "min_title_length": 6,
+        "description": "Reddit post about {query}",
+        "url": "https://www.reddit.com/search/?q={encoded_query}",
+        "engagement": "votes"
+    }
+}
 
 
 class FirecrawlService:
@@ -23,7 +93,9 @@ class FirecrawlService:
         self,
         host: str = "http://localhost:3002",
         api_key: Optional[str] = None,
-        timeout: int = 30
+        timeout: int = 30,
+        max_concurrency: int = 16,
+        http_client: Optional[httpx.AsyncClient] = None
     ):
         """
         Initialize the Firecrawl service
@@ -32,10 +104,26 @@ class FirecrawlService:
             host: Firecrawl server host URL
             api_key: Optional API key for hosted service
             timeout: Request timeout in seconds
+            max_concurrency: Maximum number of scrape requests in flight at once
+            http_client: Shared HTTP client (a dedicated one is created if omitted)
         """
         self.host = host.rstrip("/")
         self.api_key = api_key
         self.timeout = timeout
+        # Reads may take the full timeout; connecting, sending and waiting
+        # for a pooled connection should fail fast
+        self.request_timeout = httpx.Timeout(timeout, connect=5.0, write=5.0, pool=2.0)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._scrape_cache: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._available: Optional[bool] = None
+        self._available_checked_at = 0.0
+        self._owns_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(
+            http2=True,
+            follow_redirects=True,
+            timeout=self.request_timeout,
+            limits=httpx.Limits(max_keepalive_connections=100, max_connections=1000)
+        )
         
         # Common sources for trending topics
         self.source_configs = {
@@ -70,20 +158,37 @@ class FirecrawlService:
         
         logger.info(f"Firecrawl Service initialized with host: {host}")
     
-    def is_available(self) -> bool:
+    async def aclose(self) -> None:
+        """Close the HTTP client if this service created it"""
+        if self._owns_client:
+            await self.http_client.aclose()
+    
+    async def is_available(self) -> bool:
         """
         Check if Firecrawl service is available
         
+        The result is cached for AVAILABILITY_TTL seconds.
+        
         Returns:
             True if Firecrawl is running and accessible
         """
+        now = time.monotonic()
+        if self._available is not None and now - self._available_checked_at < AVAILABILITY_TTL:
+            return self._available
+        
         try:
-            response = httpx.get(f"{self.host}/api/v1/scrape/status", timeout=5.0)
-            return response.status_code == 200
+            response = await self.http_client.get(
+                f"{self.host}/api/v1/scrape/status",
+                timeout=httpx.Timeout(2.0, connect=0.5)
+            )
+            available = response.status_code == 200
         except Exception as e:
             logger.warning(f"Firecrawl not available: {e}")
-            # Return True to allow simulation mode
-            return True
+            available = False
+        
+        self._available = available
+        self._available_checked_at = now
+        return available
     
     async def scrape_trending_topics(
         self,
@@ -104,27 +209,26 @@ class FirecrawlService:
         Returns:
             List of trending topic dictionaries
         """
-        trends = []
-        
         # Determine which sources to use
         if sources is None:
             sources = self._get_default_sources(niche)
         
         # Scrape from each source
+        encoded_query = quote_plus(query)
         tasks = []
         for source in sources:
             if source in self.source_configs:
-                task = self._scrape_source(query, source, limit)
+                task = self._scrape_source(query, source, limit, encoded_query)
                 tasks.append(task)
         
         # Run all scrapes concurrently
-        if tasks:
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            for result in results:
-                if isinstance(result, list):
-                    trends.extend(result)
-                elif isinstance(result, Exception):
-                    logger.error(f"Scraping error: {result}")
+        results = await asyncio.gather(*tasks, return_exceptions=True) if tasks else []
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Scraping error: {result}")
+        trends = list(chain.from_iterable(
+            result for result in results if isinstance(result, list)
+        ))
         
         # Sort by engagement/relevance
         trends = self._sort_and_deduplicate(trends)
@@ -142,35 +246,155 @@ class FirecrawlService:
         Returns:
             Dictionary containing scraped content
         """
+        cache_key = ("url", url)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return dict(cached)
+        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
+            async with self._semaphore:
+                response = await self.http_client.post(
                     f"{self.host}/api/v1/scrape",
-                    json={
+                    content=orjson.dumps({
                         "url": url,
                         "formats": ["markdown", "html"],
                         "onlyMainContent": True
-                    },
-                    timeout=self.timeout
+                    }),
+                    headers=JSON_HEADERS,
+                    timeout=self.request_timeout
                 )
+            
+            if response.status_code == 200:
+                content = self._document_content(url, orjson.loads(response.content))
+                self._cache_put(cache_key, content)
+                return dict(content)
+            else:
+                return {"url": url, "success": False, "error": response.text}
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "url": url,
-                        "title": data.get("metadata", {}).get("title", ""),
-                        "content": data.get("markdown", ""),
-                        "html": data.get("html", ""),
-                        "description": data.get("metadata", {}).get("description", ""),
-                        "success": True
-                    }
-                else:
-                    return {"url": url, "success": False, "error": response.text}
-                    
         except Exception as e:
             logger.error(f"URL scraping error: {e}")
             return {"url": url, "success": False, "error": str(e)}
     
+    async def _batch_scrape(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """
+        Scrape several URLs with one Firecrawl batch job
+        
+        Cached URLs are served from the cache. If the batch endpoint is
+        unavailable or the job does not finish within the service timeout,
+        the remaining URLs are scraped individually.
+        
+        Args:
+            urls: URLs to scrape
+            
+        Returns:
+            Scraped content dictionaries, in the same order as urls
+        """
+        contents: Dict[str, Dict[str, Any]] = {}
+        for url in urls:
+            cached = self._cache_get(("url", url))
+            if cached is not None:
+                contents[url] = dict(cached)
+        
+        pending = [url for url in urls if url not in contents]
+        if pending:
+            try:
+                documents = await self._run_batch_job(pending)
+            except Exception as e:
+                logger.warning(f"Batch scrape failed, scraping individually: {e}")
+                documents = None
+            
+            if documents is None:
+                # Requests to one host share a connection, so run them concurrently
+                scraped = await asyncio.gather(*(
+                    self.scrape_url_content(url) for url in pending
+                ))
+                contents.update(zip(pending, scraped))
+            else:
+                # Batch results are unordered and sourceURL may be a
+                # normalized or redirected form of the requested URL
+                by_source: Dict[str, Dict[str, Any]] = {}
+                for document in documents:
+                    source = document.get("metadata", {}).get("sourceURL")
+                    if source:
+                        by_source[source] = document
+                        by_source.setdefault(self._normalize_url(source), document)
+                
+                missing = []
+                for url in pending:
+                    document = by_source.get(url) or by_source.get(self._normalize_url(url))
+                    if document is None:
+                        missing.append(url)
+                        continue
+                    content = self._document_content(url, document)
+                    self._cache_put(("url", url), content)
+                    contents[url] = dict(content)
+                
+                if missing:
+                    scraped = await asyncio.gather(*(
+                        self.scrape_url_content(url) for url in missing
+                    ))
+                    contents.update(zip(missing, scraped))
+        
+        return [contents[url] for url in urls]
+    
+    async def _run_batch_job(self, urls: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Start a Firecrawl batch scrape and poll it; None if it cannot complete"""
+        async with self._semaphore:
+            response = await self.http_client.post(
+                f"{self.host}/api/v1/batch/scrape",
+                content=orjson.dumps({
+                    "urls": urls,
+                    "formats": ["markdown", "html"],
+                    "onlyMainContent": True
+                }),
+                headers=JSON_HEADERS,
+                timeout=self.request_timeout
+            )
+        if response.status_code != 200:
+            return None
+        
+        job_id = orjson.loads(response.content).get("id")
+        if not job_id:
+            return None
+        
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(1.0)
+            async with self._semaphore:
+                response = await self.http_client.get(
+                    f"{self.host}/api/v1/batch/scrape/{job_id}",
+                    timeout=self.request_timeout
+                )
+            if response.status_code != 200:
+                return None
+            job = orjson.loads(response.content)
+            if job.get("status") == "completed":
+                return job.get("data", [])
+            if job.get("status") == "failed":
+                return None
+        
+        return None
+    
+    def _normalize_url(self, url: str) -> str:
+        """Reduce a URL to a comparable form (case, www, trailing slash, query order)"""
+        parts = urlsplit(url.strip())
+        host = parts.netloc.lower().removeprefix("www.")
+        path = parts.path.rstrip("/")
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return f"{host}{path}?{query}" if query else f"{host}{path}"
+    
+    def _document_content(self, url: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a Firecrawl document into a scraped content dictionary"""
+        metadata = data.get("metadata", {})
+        return {
+            "url": url,
+            "title": metadata.get("title", ""),
+            "content": data.get("markdown", ""),
+            "html": data.get("html", ""),
+            "description": metadata.get("description", ""),
+            "success": True
+        }
+    
     async def search_related_content(
         self,
         topic: str,
@@ -189,17 +413,20 @@ class FirecrawlService:
         # Use Firecrawl's search capability (if available)
         # Or fall back to direct URL scraping
         
+        encoded_topic = quote_plus(topic)
         search_urls = [
-            f"https://news.google.com/search?q={topic.replace(' ', '%20')}",
-            f"https://www.reddit.com/search/?q={topic.replace(' ', '%20')}&sort=relevance",
-            f"https://www.youtube.com/results?search_query={topic.replace(' ', '%20')}"
+            f"https://news.google.com/search?q={encoded_topic}",
+            f"https://www.reddit.com/search/?q={encoded_topic}&sort=relevance",
+            f"https://www.youtube.com/results?search_query={encoded_topic}"
         ]
         
+        contents = await self._batch_scrape(search_urls[:max_results])
+        
         results = []
         
-        for url in search_urls[:max_results]:
-            content = await self.scrape_url_content(url)
+        for content in contents:
             if content.get("success"):
+                url = content["url"]
                 results.append({
                     "url": url,
                     "title": content.get("title", "")[:100],
@@ -227,20 +454,20 @@ class FirecrawlService:
         # Scrape related content
         related_content = await self.search_related_content(topic, count)
         
-        # Generate video ideas based on scraped content
-        ideas = []
-        for i, content in enumerate(related_content):
-            idea = {
+        # Generate video ideas based on scraped content; the hook only
+        # depends on the topic
+        hook = self._generate_idea_hook(topic)
+        return [
+            {
                 "id": i + 1,
                 "title": self._generate_idea_title(topic, content),
-                "hook": self._generate_idea_hook(topic, content),
+                "hook": hook,
                 "angle": self._extract_angle(content),
                 "source_url": content.get("url", ""),
                 "source_name": content.get("source", "")
             }
-            ideas.append(idea)
-        
-        return ideas
+            for i, content in enumerate(related_content)
+        ]
     
     async def analyze_competition(
         self,
@@ -277,7 +504,8 @@ class FirecrawlService:
         self,
         query: str,
         source: str,
-        limit: int
+        limit: int,
+        encoded_query: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Scrape trending topics from a specific source
@@ -286,6 +514,7 @@ class FirecrawlService:
             query: Search query
             source: Source name
             limit: Maximum results
+            encoded_query: URL-encoded query, computed from query if omitted
             
         Returns:
             List of trend items
@@ -293,38 +522,176 @@ class FirecrawlService:
         config = self.source_configs.get(source, {})
         base_url = config.get("base_url", "")
         
+        if encoded_query is None:
+            encoded_query = quote_plus(query)
+        
         # Build search URL based on source
-        search_url = self._build_search_url(source, query)
+        search_url = self._build_search_url(source, encoded_query)
         
         if not search_url:
             return []
         
+        cache_key = ("source", source, query.strip().lower())
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    search_url,
-                    timeout=self.timeout,
-                    follow_redirects=True
+            status_code, html = await self._fetch_search_page_with_retry(search_url, source)
+            
+            if status_code == 200:
+                # Parse in a worker thread so other sources keep downloading
+                trends = await asyncio.to_thread(
+                    self._parse_search_results,
+                    html,
+                    source,
+                    query,
+                    encoded_query
                 )
+                self._cache_put(cache_key, trends)
+                return list(trends)
+            else:
+                logger.warning(f"Failed to scrape {source}: {status_code}")
+                return self._get_simulated_trends(query, source, limit, encoded_query)
                 
-                if response.status_code == 200:
-                    return self._parse_search_results(
-                        response.text,
-                        source,
-                        query
-                    )
-                else:
-                    logger.warning(f"Failed to scrape {source}: {response.status_code}")
-                    return self._get_simulated_trends(query, source, limit)
-                    
+        except httpx.TimeoutException as e:
+            logger.warning(f"Timed out scraping {source}: {type(e).__name__}")
+            return self._get_simulated_trends(query, source, limit, encoded_query)
         except Exception as e:
             logger.error(f"Error scraping {source}: {e}")
-            return self._get_simulated_trends(query, source, limit)
+            return self._get_simulated_trends(query, source, limit, encoded_query)
+    
+    async def _fetch_search_page_with_retry(self, url: str, source: str) -> tuple[int, str]:
+        """
+        Download a search page, retrying transient failures with backoff
+        
+        Connection errors and RETRYABLE_STATUS_CODES responses are retried
+        up to SCRAPE_RETRY_ATTEMPTS times; a Retry-After header takes the
+        place of the backoff delay.
+        
+        Args:
+            url: Search page URL
+            source: Source name
+            
+        Returns:
+            Tuple of (HTTP status code, page text received) of the last attempt
+        """
+        for attempt in range(SCRAPE_RETRY_ATTEMPTS):
+            last_attempt = attempt == SCRAPE_RETRY_ATTEMPTS - 1
+            try:
+                status_code, html, retry_after = await self._fetch_search_page(url, source)
+            except httpx.TransportError as e:
+                # A read timeout already used the full timeout; don't repeat it
+                if last_attempt or isinstance(e, httpx.ReadTimeout):
+                    raise
+                reason = type(e).__name__
+                retry_after = None
+            else:
+                if status_code not in RETRYABLE_STATUS_CODES or last_attempt:
+                    return status_code, html
+                reason = status_code
+            
+            delay = self._retry_delay(attempt, retry_after)
+            if delay is None:
+                return status_code, html
+            logger.debug(f"Retrying {source} in {delay:.2f}s after {reason}")
+            await asyncio.sleep(delay)
+    
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt
+        
+        Args:
+            attempt: Zero-based number of the attempt that failed
+            retry_after: Retry-After header of the failed response, if any
+            
+        Returns:
+            Delay in seconds, or None if Retry-After asks for a longer wait
+            than SCRAPE_RETRY_AFTER_MAX
+        """
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                if delay > SCRAPE_RETRY_AFTER_MAX:
+                    return None
+                return max(delay, 0.0)
+        
+        backoff = min(SCRAPE_RETRY_MAX_DELAY, SCRAPE_RETRY_BASE_DELAY * 2 ** attempt)
+        return backoff + random.uniform(0, SCRAPE_RETRY_BASE_DELAY)
     
-    def _build_search_url(self, source: str, query: str) -> Optional[str]:
-        """Build search URL for a source"""
-        encoded_query = query.replace(" ", "%20")
+    async def _fetch_search_page(
+        self,
+        url: str,
+        source: str
+    ) -> tuple[int, str, Optional[str]]:
+        """
+        Download a search page, stopping early once enough titles have arrived
         
+        Pages of sources in JSON_TITLE_SOURCES are streamed and the download
+        ends as soon as MAX_PARSED_RESULTS title matches are buffered; other
+        pages are read in full for the HTML parser.
+        
+        Args:
+            url: Search page URL
+            source: Source name
+            
+        Returns:
+            Tuple of (HTTP status code, page text received, Retry-After header)
+        """
+        async with self._semaphore:
+            async with self.http_client.stream(
+                "GET",
+                url,
+                timeout=self.request_timeout,
+                follow_redirects=True
+            ) as response:
+                if response.status_code != 200 or source not in JSON_TITLE_SOURCES:
+                    await response.aread()
+                    return (
+                        response.status_code,
+                        response.text,
+                        response.headers.get("Retry-After")
+                    )
+                
+                html = ""
+                scan_from = 0
+                matches = 0
+                async for chunk in response.aiter_text(chunk_size=65536):
+                    html += chunk
+                    for match in JSON_TITLE_RE.finditer(html, scan_from):
+                        matches += 1
+                        scan_from = match.end()
+                        if matches == MAX_PARSED_RESULTS:
+                            return response.status_code, html, None
+                
+                return response.status_code, html, None
+    
+    def _cache_get(self, key: tuple) -> Optional[Any]:
+        """Return a fresh cached scrape result, or None on a miss"""
+        entry = self._scrape_cache.get(key)
+        if entry is None or time.monotonic() - entry[0] >= SCRAPE_CACHE_TTL:
+            logger.debug("Scrape cache MISS: {}", key)
+            return None
+        self._scrape_cache.move_to_end(key)
+        logger.debug("Scrape cache HIT: {}", key)
+        return entry[1]
+    
+    def _cache_put(self, key: tuple, value: Any) -> None:
+        """Store a scrape result, evicting the least recently used entries"""
+        self._scrape_cache[key] = (time.monotonic(), value)
+        self._scrape_cache.move_to_end(key)
+        while len(self._scrape_cache) > SCRAPE_CACHE_SIZE:
+            self._scrape_cache.popitem(last=False)
+    
+    def _build_search_url(self, source: str, encoded_query: str) -> Optional[str]:
+        """Build search URL for a source from an already URL-encoded query"""
         urls = {
             "youtube": f"https://www.youtube.com/results?search_query={encoded_query}",
             "reddit": f"https://www.reddit.com/search/?q={encoded_query}&sort=relevance",
@@ -338,7 +705,8 @@ class FirecrawlService:
         self,
         html: str,
         source: str,
-        query: str
+        query: str,
+        encoded_query: str
     ) -> List[Dict[str, Any]]:
         """
         Parse HTML search results into structured data
@@ -347,66 +715,67 @@ class FirecrawlService:
             html: Raw HTML response
             source: Source name
             query: Original search query
+            encoded_query: URL-encoded search query
             
         Returns:
             List of parsed trend items
         """
         trends = []
-        
-        # Use simple regex patterns to extract content
-        # In production, use BeautifulSoup or similar
-        
-        if source == "youtube":
-            # Extract video titles and URLs
-            titles = re.findall(r'"title":"([^"]+)"', html)
-            for title in titles[:10]:
-                if title and len(title) > 10:
-                    trends.append({
-                        "id": str(len(trends) + 1),
-                        "title": title,
-                        "description": f"Video about {query}",
-                        "source": "youtube",
-                        "url": f"https://www.youtube.com/results?search_query={query.replace(' ', '%20')}",
-                        "engagement": {"views": "N/A"},
-                        "scraped_at": datetime.now().isoformat()
-                    })
-        
-        elif source == "reddit":
-            # Extract post titles
-            titles = re.findall(r'"title":"([^"]+)"', html)
-            for title in titles[:10]:
-                if title and len(title) > 5:
+        scraped_at = datetime.now().isoformat()
+        
+        json_config = JSON_TITLE_SOURCES.get(source)
+        if json_config:
+            # Extract titles from the page's embedded result data
+            description = json_config["description"].format(query=query)
+            url = json_config["url"].format(encoded_query=encoded_query)
+            for match in islice(JSON_TITLE_RE.finditer(html), MAX_PARSED_RESULTS):
+                title = match.group(1)
+                if len(title) >= json_config["min_title_length"]:
                     trends.append({
                         "id": str(len(trends) + 1),
                         "title": title,
-                        "description": f"Reddit post about {query}",
-                        "source": "reddit",
-                        "url": f"https://www.reddit.com/search/?q={query.replace(' ', '%20')}",
-                        "engagement": {"votes": "N/A"},
-                        "scraped_at": datetime.now().isoformat()
+                        "description": description,
+                        "source": source,
+                        "url": url,
+                        "engagement": {json_config["engagement"]: "N/A"},
+                        "scraped_at": scraped_at
                     })
         
         else:
-            # Generic parsing
-            titles = re.findall(r'<[^>]+>([^<]{20,100})</[^>]+>', html)
-            for title in titles[:10]:
+            # Generic parsing: titles from the source's CSS selector
+            nodes = LexborHTMLParser(html).css(self._title_selector(source))
+            for node in nodes:
+                title = node.text(strip=True)
+                if not 20 <= len(title) <= 100:
+                    continue
                 trends.append({
                     "id": str(len(trends) + 1),
-                    "title": title.strip(),
+                    "title": title,
                     "description": f"Content about {query}",
                     "source": source,
                     "url": "",
                     "engagement": {},
-                    "scraped_at": datetime.now().isoformat()
+                    "scraped_at": scraped_at
                 })
+                if len(trends) == MAX_PARSED_RESULTS:
+                    break
         
         return trends
     
+    def _title_selector(self, source: str) -> str:
+        """Get the CSS selector for result titles on a source's search page"""
+        selectors = self.source_configs.get(source, {}).get("selectors", {})
+        for key in TITLE_SELECTOR_KEYS:
+            if key in selectors:
+                return selectors[key]
+        return "h3, h2"
+    
     def _get_simulated_trends(
         self,
         query: str,
         source: str,
-        limit: int
+        limit: int,
+        encoded_query: str
     ) -> List[Dict[str, Any]]:
         """
         Get simulated trending topics when scraping fails
@@ -415,6 +784,7 @@ class FirecrawlService:
             query: Search query
             source: Source name
             limit: Number of trends
+            encoded_query: URL-encoded search query
             
         Returns:
             List of simulated trend items
@@ -432,21 +802,26 @@ class FirecrawlService:
             f"The Untold Story of {query}"
         ]
         
-        trends = []
-        for i, title in enumerate(templates[:limit]):
-            trends.append({
+        base = {
+            "description": f"Trending content about {query} from {source}",
+            "source": source,
+            "url": f"https://{source}.com/search?q={encoded_query}",
+            "scraped_at": datetime.now().isoformat()
+        }
+        
+        trends = [
+            {
+                **base,
                 "id": str(i + 1),
                 "title": title,
-                "description": f"Trending content about {query} from {source}",
-                "source": source,
-                "url": f"https://{source}.com/search?q={query.replace(' ', '%20')}",
                 "engagement": {
                     "simulated": True,
                     "views": f"{1000 + (i * 500)}",
                     "likes": f"{100 + (i * 50)}"
-                },
-                "scraped_at": datetime.now().isoformat()
-            })
+                }
+            }
+            for i, title in enumerate(templates[:limit])
+        ]
         
         return trends
     
@@ -468,40 +843,35 @@ class FirecrawlService:
         trends: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """Sort trends by engagement and remove duplicates"""
-        seen_titles = set()
-        unique_trends = []
-        
+        # First trend per normalized title wins; dicts keep insertion order
+        by_title: Dict[str, Dict[str, Any]] = {}
         for trend in trends:
-            title = trend.get("title", "").lower().strip()
-            if title and title not in seen_titles:
-                seen_titles.add(title)
-                unique_trends.append(trend)
-        
-        # Sort by simulated engagement score
-        unique_trends.sort(
-            key=lambda x: int(x.get("engagement", {}).get("views", "0").replace(",", "") or 0),
-            reverse=True
-        )
+            title = trend.get("title", "").strip().lower()
+            if title and title not in by_title:
+                by_title[title] = trend
         
-        return unique_trends
+        # Sort by engagement score (key computed once per trend)
+        return sorted(by_title.values(), key=self._views_count, reverse=True)
+    
+    def _views_count(self, trend: Dict[str, Any]) -> int:
+        """Parse a trend's view count, treating missing or non-numeric values as 0"""
+        views = trend.get("engagement", {}).get("views", "0")
+        try:
+            return int(views.translate(THOUSANDS_SEPARATORS) or 0)
+        except ValueError:
+            return 0
     
     def _extract_common_themes(self, trends: List[Dict[str, Any]]) -> List[str]:
         """Extract common themes from trends"""
-        # Simplified theme extraction
-        themes = []
+        # Simplified theme extraction: keyword matches in the top titles
+        themes = {}
         for trend in trends[:5]:
-            title = trend.get("title", "")
-            # Extract key phrases
-            if "how" in title.lower():
-                themes.append("How-to content")
-            if "top" in title.lower():
-                themes.append("List-style content")
-            if "why" in title.lower():
-                themes.append("Explanation content")
-            if "review" in title.lower():
-                themes.append("Review content")
-        
-        return list(set(themes))
+            title = trend.get("title", "").lower()
+            for keyword, theme in THEME_KEYWORDS:
+                if keyword in title:
+                    themes[theme] = None
+        
+        return list(themes)
     
     def _analyze_engagement(self, trends: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze engagement patterns in trends"""
@@ -544,19 +914,9 @@ class FirecrawlService:
             return f"Deep Dive: {base_title}"
         return f"Everything About {topic}"
     
-    def _generate_idea_hook(
-        self,
-        topic: str,
-        content: Dict[str, Any]
-    ) -> str:
+    def _generate_idea_hook(self, topic: str) -> str:
         """Generate a hook for the video idea"""
-        hooks = [
-            f"You won't believe what I discovered about {topic}...",
-            f"This changed everything I knew about {topic}.",
-            f"If you're interested in {topic}, you need to hear this.",
-            f"The truth about {topic} might surprise you."
-        ]
-        return hooks[0]
+        return HOOK_TEMPLATES[0].format(topic=topic)
     
     def _extract_angle(self, content: Dict[str, Any]) -> str:
         """Extract the content angle"""
@@ -564,8 +924,9 @@ class FirecrawlService:
     
     def _get_domain(self, url: str) -> str:
         """Extract domain from URL"""
-        try:
-            from urllib.parse import urlparse
-            return urlparse(url).netloc.replace("www.", "")
-        except:
-            return "unknown"
+        scheme_end = url.find("://")
+        start = scheme_end + 3 if scheme_end != -1 else 0
+        end = url.find("/", start)
+        host = url[start:end] if end != -1 else url[start:]
+        host = host.removeprefix("www.")
+        return host or "unknown"
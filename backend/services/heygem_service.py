@@ -4,14 +4,80 @@ HeyGem/Duix AI avatar video generation integration
 """
 
 import asyncio
+import mimetypes
 import os
-import subprocess
 import time
+from collections import OrderedDict, deque
+from contextlib import ExitStack
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, Optional
+from urllib.parse import urlparse
+from typing import Dict, Any, Optional, List
 from loguru import logger
 
+import aiofiles
+import aiofiles.os
 import httpx
+import orjson
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
+
+# Chunk size for streaming generated videos to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Videos at least this large are fetched as parallel byte ranges when the
+# server supports them
+RANGED_DOWNLOAD_MIN_SIZE = 50 * 1024 * 1024
+RANGED_DOWNLOAD_PARTS = 4
+
+# Seconds a successful API health check is trusted before probing again
+API_HEALTH_TTL = 10.0
+
+# Probed video durations kept, keyed on (path, mtime, size)
+DURATION_CACHE_SIZE = 1024
+
+# Seconds to wait for the API health probe before a local installation is
+# used instead
+API_PROBE_GRACE = 1.0
+
+# Hostnames that mean the HeyGem server shares this machine's filesystem
+LOCAL_HOSTNAMES = frozenset({"localhost", "127.0.0.1", "::1"})
+
+# Trailing stderr lines of a local HeyGem run kept for the error message
+STDERR_TAIL_LINES = 50
+
+
+@dataclass(frozen=True, slots=True)
+class AvatarPreset:
+    """An avatar that can be used for generation"""
+    key: str
+    name: str
+    description: str
+    model: str
+    custom: bool = False
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the preset for API responses"""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "model": self.model,
+            "custom": self.custom
+        }
+
+
+# Built-in avatar presets
+DEFAULT_AVATARS: tuple[AvatarPreset, ...] = (
+    AvatarPreset("neutral", "Neutral Avatar", "Professional neutral expression", "avatar_neutral"),
+    AvatarPreset("happy", "Happy Avatar", "Friendly smiling avatar", "avatar_happy"),
+    AvatarPreset(
+        "professional", "Business Avatar", "Professional business attire", "avatar_professional"
+    )
+)
 
 
 class HeyGemService:
@@ -24,7 +90,8 @@ class HeyGemService:
         self,
         host: str = "http://localhost:8001",
         models_dir: Optional[str] = None,
-        device: str = "cuda"
+        device: str = "cuda",
+        http_client: Optional[httpx.AsyncClient] = None
     ):
         """
         Initialize the HeyGem service
@@ -33,63 +100,73 @@ class HeyGemService:
             host: HeyGem server host URL
             models_dir: Directory for HeyGem models
             device: Device to use (cuda or cpu)
+            http_client: Shared HTTP client (a dedicated one is created if omitted)
         """
         self.host = host.rstrip("/") if host else "http://localhost:8001"
         self.models_dir = Path(models_dir) if models_dir else Path.home() / ".heygem" / "models"
         self.device = device
+        self._host_is_local = urlparse(self.host).hostname in LOCAL_HOSTNAMES
+        self._owns_client = http_client is None
+        self.http_client = http_client or self._create_http_client()
         
         # HeyGem installation paths
         self.heygem_install_dir = Path(__file__).parent.parent.parent / "heygem"
-        
-        # Default avatar presets
-        self.default_avatars = {
-            "neutral": {
-                "name": "Neutral Avatar",
-                "description": "Professional neutral expression",
-                "model": "avatar_neutral"
-            },
-            "happy": {
-                "name": "Happy Avatar",
-                "description": "Friendly smiling avatar",
-                "model": "avatar_happy"
-            },
-            "professional": {
-                "name": "Business Avatar",
-                "description": "Professional business attire",
-                "model": "avatar_professional"
-            }
-        }
+        self._run_py = str(self.heygem_install_dir / "run.py")
+        # _generate_locally can only drive the bundled run.py, not HeyGem.exe
+        # or a system-wide binary
+        self._can_run_locally = Path(self._run_py).exists()
+        self._configs_dir = self.models_dir / "configs"
+        self._potential_install_paths = (
+            Path.home() / "HeyGem" / "HeyGem.exe",
+            Path("/opt/heygem/bin/heygem"),
+            self.heygem_install_dir / "run.py"
+        )
+        self._installed: Optional[bool] = None
+        self._api_ok_until = 0.0
+        self._background_probes: set[asyncio.Task] = set()
+        # (models_dir mtime, avatars) from the last directory scan
+        self._avatars_cache: Optional[tuple[int, tuple[AvatarPreset, ...]]] = None
+        self._duration_cache: OrderedDict[tuple[str, int, int], int] = OrderedDict()
         
         # Check if HeyGem is installed locally
         self._check_installation()
         
         logger.info(f"HeyGem Service initialized with host: {self.host}")
     
-    def is_available(self) -> bool:
+    @staticmethod
+    def _create_http_client() -> httpx.AsyncClient:
+        """Create the HTTP client used when none is injected"""
+        # Generation requests can run for minutes; connecting should not
+        return httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(300.0, connect=5.0),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=40)
+        )
+    
+    async def aclose(self) -> None:
+        """Close the HTTP client if this service created it"""
+        if self._owns_client:
+            await self.http_client.aclose()
+    
+    async def is_available(self) -> bool:
         """
         Check if HeyGem service is available
         
         Returns:
-            True if HeyGem is running and accessible
+            True if the HeyGem API is running or HeyGem is installed locally
         """
-        try:
-            response = httpx.get(f"{self.host}/api/health", timeout=5.0)
-            return response.status_code == 200
-        except Exception as e:
-            logger.warning(f"HeyGem not available: {e}")
-            # Check for local installation
-            return self._check_local_installation()
+        return await self._is_api_available() or self._check_local_installation()
     
     def _check_installation(self) -> bool:
-        """Check if HeyGem is installed locally"""
+        """Check if HeyGem is installed locally (checked once per process)"""
+        if self._installed is None:
+            self._installed = self._find_installation()
+        return self._installed
+    
+    def _find_installation(self) -> bool:
+        """Look for a HeyGem installation in the common paths"""
         # Check common installation paths
-        potential_paths = [
-            Path.home() / "HeyGem" / "HeyGem.exe",
-            Path("/opt/heygem/bin/heygem"),
-            Path(__file__).parent.parent.parent / "heygem" / "run.py"
-        ]
-        
-        for path in potential_paths:
+        for path in self._potential_install_paths:
             if path.exists():
                 logger.info(f"HeyGem found at: {path}")
                 return True
@@ -101,27 +178,45 @@ class HeyGemService:
         """Check for local HeyGem installation"""
         return self._check_installation()
     
-    def get_available_avatars(self) -> Dict[str, Any]:
+    def get_available_avatars(self) -> List[AvatarPreset]:
         """
         Get list of available avatars
         
+        Custom avatars in models_dir replace built-in presets with the same key.
+        
         Returns:
-            Dictionary of available avatars
-        """
-        avatars = self.default_avatars.copy()
-        
-        # Check for custom avatars in models directory
-        if self.models_dir.exists():
-            for avatar_dir in self.models_dir.iterdir():
-                if avatar_dir.is_dir():
-                    avatars[avatar_dir.name] = {
-                        "name": avatar_dir.name.replace("_", " ").title(),
-                        "description": f"Custom avatar from {avatar_dir.name}",
-                        "model": str(avatar_dir),
-                        "custom": True
-                    }
+            List of available avatar presets
+        """
+        # Rescan only when an avatar directory was added, removed or renamed
+        try:
+            mtime = self.models_dir.stat().st_mtime_ns
+        except OSError:
+            mtime = 0
+        if self._avatars_cache is not None and self._avatars_cache[0] == mtime:
+            return list(self._avatars_cache[1])
         
-        return avatars
+        # Check for custom avatars in models directory; scandir entries know
+        # their type, so no extra stat per entry
+        custom = []
+        if mtime:
+            with os.scandir(self.models_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        custom.append(AvatarPreset(
+                            key=entry.name,
+                            name=entry.name.replace("_", " ").title(),
+                            description=f"Custom avatar from {entry.name}",
+                            model=entry.path,
+                            custom=True
+                        ))
+        
+        custom_keys = {avatar.key for avatar in custom}
+        avatars = tuple(
+            avatar for avatar in DEFAULT_AVATARS if avatar.key not in custom_keys
+        ) + tuple(custom)
+        
+        self._avatars_cache = (mtime, avatars)
+        return list(avatars)
     
     async def generate_avatar_video(
         self,
@@ -129,7 +224,8 @@ class HeyGemService:
         audio_path: str,
         script_text: str,
         output_path: str,
-        options: Optional[Dict[str, Any]] = None
+        options: Optional[Dict[str, Any]] = None,
+        api_available: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
         Generate an avatar video with lip-sync
@@ -140,6 +236,7 @@ class HeyGemService:
             script_text: Script text for lip-sync
             output_path: Path for output video
             options: Additional options
+            api_available: Known API availability (probed when omitted)
             
         Returns:
             Dictionary with generation results
@@ -147,14 +244,32 @@ class HeyGemService:
         options = options or {}
         
         try:
+            # With the server on this machine, a local installation reads the
+            # files in place instead of copying them through an HTTP upload;
+            # if that run fails, the API can still take the job
+            tried_locally = self._host_is_local and self._can_run_locally
+            if tried_locally:
+                result = await self._generate_locally(
+                    avatar_path, audio_path, output_path, options
+                )
+                if result.get("success"):
+                    return result
+                logger.warning("Local HeyGem run failed, trying the API")
+            
+            if api_available is None:
+                # Only cut a slow probe short when run.py can take over
+                api_available = await self._probe_api(
+                    wait_briefly=self._can_run_locally and not tried_locally
+                )
+            
             # Method 1: Use HeyGem API if available
-            if await self._is_api_available():
+            if api_available:
                 return await self._generate_via_api(
                     avatar_path, audio_path, output_path, options
                 )
             
             # Method 2: Use local HeyGem installation
-            elif self._check_local_installation():
+            elif self._can_run_locally and not tried_locally:
                 return await self._generate_locally(
                     avatar_path, audio_path, output_path, options
                 )
@@ -174,15 +289,50 @@ class HeyGemService:
                 "output_path": None
             }
     
-    async def _is_api_available(self) -> bool:
-        """Check if HeyGem API is available"""
+    async def _probe_api(self, wait_briefly: bool) -> bool:
+        """
+        Check the HeyGem API, optionally giving up after API_PROBE_GRACE
+        
+        When a local installation can take over, a slow probe should not
+        hold up the generation: after API_PROBE_GRACE the API is treated
+        as unavailable while the probe finishes in the background and
+        refreshes the cached result for later calls.
+        
+        Args:
+            wait_briefly: Stop waiting after API_PROBE_GRACE seconds
+            
+        Returns:
+            True if the API answered healthy in time
+        """
+        if not wait_briefly:
+            return await self._is_api_available()
+        
+        probe = asyncio.create_task(self._is_api_available())
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.host}/api/health", timeout=5.0)
-                return response.status_code == 200
-        except:
+            return await asyncio.wait_for(asyncio.shield(probe), API_PROBE_GRACE)
+        except asyncio.TimeoutError:
+            logger.info("HeyGem API slow to answer, generating locally")
+            self._background_probes.add(probe)
+            probe.add_done_callback(self._background_probes.discard)
             return False
     
+    async def _is_api_available(self) -> bool:
+        """Check if HeyGem API is available (successes are cached for API_HEALTH_TTL)"""
+        now = time.monotonic()
+        if now < self._api_ok_until:
+            return True
+        
+        try:
+            response = await self.http_client.get(f"{self.host}/api/health", timeout=5.0)
+            available = response.status_code == 200
+        except Exception as e:
+            logger.warning(f"HeyGem not available: {e}")
+            available = False
+        
+        if available:
+            self._api_ok_until = now + API_HEALTH_TTL
+        return available
+    
     async def _generate_via_api(
         self,
         avatar_path: str,
@@ -203,12 +353,6 @@ class HeyGemService:
             Generation result dictionary
         """
         try:
-            # Prepare the request
-            files = {
-                "avatar": open(avatar_path, "rb"),
-                "audio": open(audio_path, "rb")
-            }
-            
             data = {
                 "script_text": options.get("script_text", ""),
                 "quality": options.get("quality", "high"),
@@ -216,28 +360,31 @@ class HeyGemService:
                 "resolution": options.get("resolution", "1080p")
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
+            # httpx streams file objects into the multipart body in chunks;
+            # the stack closes whichever handles were opened, even if the
+            # second open or the upload fails
+            with ExitStack() as stack:
+                avatar_file = stack.enter_context(open(avatar_path, "rb"))
+                audio_file = stack.enter_context(open(audio_path, "rb"))
+                files = {
+                    "avatar": self._upload_field(avatar_path, avatar_file),
+                    "audio": self._upload_field(audio_path, audio_file)
+                }
+                
+                response = await self.http_client.post(
                     f"{self.host}/api/generate",
                     files=files,
                     data=data,
                     timeout=300.0
                 )
             
-            # Close file handles
-            files["avatar"].close()
-            files["audio"].close()
-            
             if response.status_code == 200:
                 result = response.json()
                 
                 # Download generated video
                 video_url = result.get("video_url")
                 if video_url:
-                    async with httpx.AsyncClient() as client:
-                        video_response = await client.get(video_url)
-                        with open(output_path, "wb") as f:
-                            f.write(video_response.content)
+                    await self._download_video(video_url, output_path)
                 
                 return {
                     "success": True,
@@ -256,6 +403,81 @@ class HeyGemService:
             logger.error(f"API generation error: {e}")
             return {"success": False, "error": str(e)}
     
+    def _upload_field(self, path: str, file: Any) -> tuple:
+        """Build a multipart (filename, file, content type) field for an upload"""
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        return (Path(path).name, file, content_type)
+    
+    async def _download_video(self, url: str, output_path: str) -> None:
+        """
+        Download a generated video, in parallel byte ranges when it is large
+        
+        Args:
+            url: Video URL
+            output_path: Destination file path
+        """
+        try:
+            head = await self.http_client.head(url, follow_redirects=True)
+            total = int(head.headers.get("Content-Length", 0)) if head.status_code == 200 else 0
+            ranged = head.headers.get("Accept-Ranges") == "bytes"
+        except (httpx.HTTPError, ValueError):
+            total, ranged = 0, False
+        
+        if ranged and total >= RANGED_DOWNLOAD_MIN_SIZE:
+            try:
+                await self._download_ranged(url, output_path, total)
+                return
+            except Exception as e:
+                logger.warning(f"Ranged download failed, retrying as one stream: {e}")
+        
+        await self._download_stream(url, output_path)
+    
+    async def _download_stream(self, url: str, output_path: str) -> None:
+        """
+        Stream a generated video to disk in DOWNLOAD_CHUNK_SIZE chunks
+        
+        Args:
+            url: Video URL
+            output_path: Destination file path
+        """
+        async with self.http_client.stream("GET", url) as response:
+            response.raise_for_status()
+            async with aiofiles.open(output_path, "wb") as f:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    await f.write(chunk)
+    
+    async def _download_ranged(self, url: str, output_path: str, total: int) -> None:
+        """
+        Download a video as RANGED_DOWNLOAD_PARTS concurrent byte ranges,
+        each written in place into a preallocated file
+        
+        Args:
+            url: Video URL
+            output_path: Destination file path
+            total: Video size in bytes
+        """
+        async with aiofiles.open(output_path, "wb") as f:
+            await f.truncate(total)
+        
+        async def fetch_part(start: int, end: int) -> None:
+            async with self.http_client.stream(
+                "GET", url, headers={"Range": f"bytes={start}-{end}"}
+            ) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise ValueError(f"Range request answered with {response.status_code}")
+                async with aiofiles.open(output_path, "r+b") as f:
+                    await f.seek(start)
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        await f.write(chunk)
+        
+        # A TaskGroup cancels the other parts as soon as one fails
+        async with asyncio.TaskGroup() as parts:
+            for i in range(RANGED_DOWNLOAD_PARTS):
+                start = i * total // RANGED_DOWNLOAD_PARTS
+                end = (i + 1) * total // RANGED_DOWNLOAD_PARTS - 1
+                parts.create_task(fetch_part(start, end))
+    
     async def _generate_locally(
         self,
         avatar_path: str,
@@ -278,7 +500,7 @@ class HeyGemService:
         try:
             # Run HeyGem via command line
             cmd = [
-                "python", str(self.heygem_install_dir / "run.py"),
+                "python", self._run_py,
                 "--avatar", avatar_path,
                 "--audio", audio_path,
                 "--output", output_path,
@@ -289,26 +511,46 @@ class HeyGemService:
             process = await asyncio.create_subprocess_exec(
                 *cmd,
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.PIPE,
+                limit=1024 * 1024
             )
             
-            stdout, stderr = await process.communicate()
+            # Drain both pipes line by line as the run progresses, keeping
+            # only the end of stderr for the error message
+            stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+            
+            async def pump(reader: asyncio.StreamReader, sink) -> None:
+                async for line in reader:
+                    sink(line.decode(errors="replace").rstrip())
+            
+            def log_stdout(line: str) -> None:
+                logger.debug(f"HeyGem: {line}")
+            
+            def log_stderr(line: str) -> None:
+                logger.debug(f"HeyGem stderr: {line}")
+                stderr_tail.append(line)
+            
+            await asyncio.gather(
+                pump(process.stdout, log_stdout),
+                pump(process.stderr, log_stderr),
+                process.wait()
+            )
+            stderr = "\n".join(stderr_tail)
             
             if process.returncode == 0:
                 # Verify output file exists
-                output_file = Path(output_path)
-                if output_file.exists():
+                if await aiofiles.os.path.exists(output_path):
                     return {
                         "success": True,
                         "output_path": output_path,
-                        "duration": self._get_video_duration(output_path),
+                        "duration": await self._get_video_duration(output_path),
                         "method": "local"
                     }
             
-            logger.error(f"HeyGem local generation failed: {stderr.decode()}")
+            logger.error(f"HeyGem local generation failed: {stderr}")
             return {
                 "success": False,
-                "error": stderr.decode() or "Local generation failed",
+                "error": stderr or "Local generation failed",
                 "output_path": None
             }
             
@@ -342,11 +584,7 @@ class HeyGemService:
             # This is a simplified fallback - in production, integrate properly
             
             # For now, create a placeholder that indicates video generation
-            output_file = Path(output_path)
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Simulate generation time
-            await asyncio.sleep(1)
+            await aiofiles.os.makedirs(Path(output_path).parent, exist_ok=True)
             
             # Return success indicator (in real implementation, this would
             # use actual video generation libraries)
@@ -364,31 +602,62 @@ class HeyGemService:
             logger.error(f"Fallback generation error: {e}")
             return {"success": False, "error": str(e)}
     
-    def generate_batch(
+    async def generate_batch_async(
         self,
         videos: list,
-        options: Optional[Dict[str, Any]] = None
+        options: Optional[Dict[str, Any]] = None,
+        max_concurrency: int = 4,
+        stagger: float = 0.0
     ) -> Dict[str, Any]:
         """
-        Generate multiple videos in batch
+        Generate multiple videos concurrently
+        
+        With a stagger, item starts are spaced at least that many seconds
+        apart so a single-GPU server can pipeline them instead of receiving
+        every upload at once; roughly one generation time divided by
+        max_concurrency keeps it busy without queueing.
         
         Args:
             videos: List of video configurations
             options: Global options for all videos
+            max_concurrency: Maximum number of videos generated at once
+            stagger: Minimum seconds between the starts of two items
             
         Returns:
             Batch generation results
         """
-        results = []
+        semaphore = asyncio.Semaphore(max_concurrency)
+        loop = asyncio.get_running_loop()
+        next_start = loop.time()
+        # Probe once up front and share the result, whether up or down
+        api_available = await self._is_api_available()
+        
+        async def run_one(video_config: Dict[str, Any]) -> Dict[str, Any]:
+            nonlocal next_start
+            async with semaphore:
+                if stagger > 0:
+                    now = loop.time()
+                    start = max(now, next_start)
+                    next_start = start + stagger
+                    await asyncio.sleep(start - now)
+                return await self.generate_avatar_video(
+                    avatar_path=video_config["avatar"],
+                    audio_path=video_config["audio"],
+                    script_text=video_config.get("script_text", ""),
+                    output_path=video_config["output"],
+                    options={**(options or {}), **video_config.get("options", {})},
+                    api_available=api_available
+                )
         
-        for i, video_config in enumerate(videos):
-            result = asyncio.run(self.generate_avatar_video(
-                avatar_path=video_config["avatar"],
-                audio_path=video_config["audio"],
-                script_text=video_config.get("script_text", ""),
-                output_path=video_config["output"],
-                options={**(options or {}), **video_config.get("options", {})}
-            ))
+        outcomes = await asyncio.gather(
+            *(run_one(video_config) for video_config in videos),
+            return_exceptions=True
+        )
+        
+        results = []
+        for i, result in enumerate(outcomes):
+            if isinstance(result, BaseException):
+                result = {"success": False, "error": str(result), "output_path": None}
             
             results.append({
                 "index": i + 1,
@@ -404,6 +673,42 @@ class HeyGemService:
             "results": results
         }
     
+    def generate_batch(
+        self,
+        videos: list,
+        options: Optional[Dict[str, Any]] = None,
+        max_concurrency: int = 4,
+        stagger: float = 0.0
+    ) -> Dict[str, Any]:
+        """
+        Generate multiple videos in batch (blocking wrapper for
+        generate_batch_async; do not call from a running event loop)
+        
+        The batch runs on its own event loop through a throwaway service with
+        its own HTTP client: pooled connections are bound to the loop that
+        opened them, so this service's long-lived client cannot be reused,
+        and it is left untouched for other callers.
+        
+        Args:
+            videos: List of video configurations
+            options: Global options for all videos
+            max_concurrency: Maximum number of videos generated at once
+            stagger: Minimum seconds between the starts of two items
+            
+        Returns:
+            Batch generation results
+        """
+        async def run_batch() -> Dict[str, Any]:
+            service = HeyGemService(self.host, str(self.models_dir), self.device)
+            try:
+                return await service.generate_batch_async(videos, options, max_concurrency, stagger)
+            finally:
+                await service.aclose()
+        
+        loop_factory = uvloop.new_event_loop if uvloop else None
+        with asyncio.Runner(loop_factory=loop_factory) as runner:
+            return runner.run(run_batch())
+    
     def get_status(self) -> Dict[str, Any]:
         """
         Get HeyGem service status
@@ -412,7 +717,8 @@ class HeyGemService:
             Status dictionary
         """
         return {
-            "api_available": self._check_local_installation(),
+            "api_available": time.monotonic() < self._api_ok_until,
+            "local_installation": self._check_local_installation(),
             "host": self.host,
             "device": self.device,
             "models_dir": str(self.models_dir),
@@ -435,18 +741,19 @@ class HeyGemService:
             True if configuration successful
         """
         # Save configuration
-        config_dir = self.models_dir / "configs"
-        config_dir.mkdir(parents=True, exist_ok=True)
+        self._configs_dir.mkdir(parents=True, exist_ok=True)
         
-        config_file = config_dir / f"{model_name}.json"
+        config_file = self._configs_dir / f"{model_name}.json"
         
-        with open(config_file, "w") as f:
-            json.dump(settings or {}, f, indent=2)
+        # Write to a temp file and swap it in so readers never see a partial config
+        tmp_file = config_file.with_suffix(".json.tmp")
+        tmp_file.write_bytes(orjson.dumps(settings or {}, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_file, config_file)
         
         logger.info(f"Model configuration saved: {model_name}")
         return True
     
-    def _get_video_duration(self, video_path: str) -> int:
+    async def _get_video_duration(self, video_path: str) -> int:
         """
         Get video duration in seconds
         
@@ -456,17 +763,36 @@ class HeyGemService:
         Returns:
             Duration in seconds
         """
+        # An unchanged file (same mtime and size) has the same duration
         try:
-            import subprocess
-            
-            result = subprocess.run(
-                ["ffprobe", "-v", "error", "-show_entries", 
-                 "format=duration", "-of", 
-                 "default=noprint_wrappers=1:nokey=1", video_path],
-                capture_output=True,
-                text=True
+            stat = await aiofiles.os.stat(video_path)
+        except OSError:
+            return 0
+        key = (video_path, stat.st_mtime_ns, stat.st_size)
+        duration = self._duration_cache.get(key)
+        if duration is not None:
+            self._duration_cache.move_to_end(key)
+            return duration
+        
+        duration = await self._probe_video_duration(video_path)
+        if duration:
+            self._duration_cache[key] = duration
+            if len(self._duration_cache) > DURATION_CACHE_SIZE:
+                self._duration_cache.popitem(last=False)
+        return duration
+    
+    async def _probe_video_duration(self, video_path: str) -> int:
+        """Read a video's duration in seconds with ffprobe (0 if it can't)"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "ffprobe", "-v", "error", "-show_entries",
+                "format=duration", "-of",
+                "default=noprint_wrappers=1:nokey=1", video_path,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
             )
+            stdout, _ = await process.communicate()
             
-            return int(float(result.stdout.strip()))
-        except:
+            return int(float(stdout.strip()))
+        except (OSError, ValueError):
             return 0
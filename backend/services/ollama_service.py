@@ -18,19 +18,31 @@ class OllamaService:
     Provides script generation capabilities
     """
     
-    def __init__(self, host: str = "http://localhost:11434"):
+    def __init__(
+        self,
+        host: str = "http://localhost:11434",
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
         """
         Initialize the Ollama service
         
         Args:
             host: Ollama server host URL
+            http_client: Shared HTTP client (a dedicated one is created if omitted)
         """
         self.host = host
+        self._owns_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient()
         self.model = "llama3"
         self.available_models: List[str] = []
         
         logger.info(f"Ollama Service initialized with host: {host}")
     
+    async def aclose(self) -> None:
+        """Close the HTTP client if this service created it"""
+        if self._owns_client:
+            await self.http_client.aclose()
+    
     def is_available(self) -> bool:
         """
         Check if Ollama service is available
@@ -290,29 +302,28 @@ Write the revised script:"""
             Generated text or None if failed
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.host}/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.7,
-                            "top_p": 0.9,
-                            "max_tokens": 2048
-                        }
-                    },
-                    timeout=120.0
-                )
+            response = await self.http_client.post(
+                f"{self.host}/api/generate",
+                json={
+                    "model": self.model,
+                    "prompt": prompt,
+                    "stream": False,
+                    "options": {
+                        "temperature": 0.7,
+                        "top_p": 0.9,
+                        "max_tokens": 2048
+                    }
+                },
+                timeout=120.0
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return data.get("response", "").strip()
+            else:
+                logger.error(f"Ollama generation failed: {response.status_code}")
+                return None
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get("response", "").strip()
-                else:
-                    logger.error(f"Ollama generation failed: {response.status_code}")
-                    return None
-                    
         except Exception as e:
             logger.error(f"Ollama API error: {e}")
             return None
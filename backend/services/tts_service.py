@@ -30,7 +30,8 @@ class EnhancedTTSService:
     def __init__(
         self,
         voices_dir: Optional[str] = None,
-        elevenlabs_api_key: Optional[str] = None
+        elevenlabs_api_key: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None
     ):
         """
         Initialize the enhanced TTS service
@@ -38,9 +39,12 @@ class EnhancedTTSService:
         Args:
             voices_dir: Directory for custom voice models
             elevenlabs_api_key: ElevenLabs API key
+            http_client: Shared HTTP client (a dedicated one is created if omitted)
         """
         self.voices_dir = Path(voices_dir) if voices_dir else Path(__file__).parent.parent.parent / "voices"
         self.elevenlabs_api_key = elevenlabs_api_key or os.getenv("ELEVENLABS_API_KEY")
+        self._owns_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient()
         
         # Create directories
         self.voices_dir.mkdir(parents=True, exist_ok=True)
@@ -61,6 +65,11 @@ class EnhancedTTSService:
         
         logger.info("Enhanced TTS Service initialized")
     
+    async def aclose(self) -> None:
+        """Close the HTTP client if this service created it"""
+        if self._owns_client:
+            await self.http_client.aclose()
+    
     def _load_voice_registry(self) -> Dict[str, Dict[str, Any]]:
         """Load voice registry from disk or create default"""
         registry_file = self.voices_dir / "registry.json"
@@ -476,14 +485,13 @@ class EnhancedTTSService:
             }
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=data, headers=headers, timeout=60.0)
-            
-            if response.status_code != 200:
-                raise RuntimeError(f"ElevenLabs API error: {response.text}")
-            
-            with open(output_path, "wb") as f:
-                f.write(response.content)
+        response = await self.http_client.post(url, json=data, headers=headers, timeout=60.0)
+        
+        if response.status_code != 200:
+            raise RuntimeError(f"ElevenLabs API error: {response.text}")
+        
+        with open(output_path, "wb") as f:
+            f.write(response.content)
         
         return self._create_result(output_path, voice_data, "elevenlabs")
     
@@ -4,14 +4,42 @@ Video composition and rendering with FFmpeg
 """
 
 import os
+import shutil
 import subprocess
+import tempfile
 import asyncio
 import json
+import re
+import uuid
+from collections import OrderedDict, deque
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 from loguru import logger
 
 
+# ffprobe results kept, keyed on (path, mtime, size)
+PROBE_CACHE_SIZE = 256
+
+# FFmpeg stderr lines kept for error messages
+STDERR_TAIL_LINES = 20
+
+# Probed jobs waiting for an encoder in generate_videos_batch
+BATCH_QUEUE_SIZE = 4
+
+# Avatar files treated as a single still frame
+STILL_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+# Hardware encoders tried in order for each software codec. VAAPI and QSV
+# are left out: they need hwupload/device setup in the filter graph.
+HW_ENCODERS = {
+    "libx264": ("h264_nvenc", "h264_videotoolbox"),
+    "libx265": ("hevc_nvenc", "hevc_videotoolbox"),
+}
+
+# Constant-quality target used for NVENC instead of a fixed bitrate
+NVENC_CQ = 23
+
+
 class VideoCompositor:
     """
     Service for video composition and rendering
@@ -21,7 +49,9 @@ class VideoCompositor:
     def __init__(
         self,
         temp_dir: Optional[str] = None,
-        output_dir: Optional[str] = None
+        output_dir: Optional[str] = None,
+        max_concurrent_renders: Optional[int] = None,
+        hw_encode: Optional[bool] = None
     ):
         """
         Initialize the video compositor
@@ -29,6 +59,10 @@ class VideoCompositor:
         Args:
             temp_dir: Directory for temporary files
             output_dir: Directory for output files
+            max_concurrent_renders: Maximum FFmpeg processes run at once
+                (defaults to FFMPEG_CONCURRENCY, else half the CPU count)
+            hw_encode: Use a hardware encoder when one works (defaults to
+                FFMPEG_HW_ENCODE, else enabled)
         """
         self.temp_dir = Path(temp_dir) if temp_dir else Path(__file__).parent.parent.parent / "temp"
         self.output_dir = Path(output_dir) if output_dir else Path(__file__).parent.parent.parent / "output"
@@ -37,9 +71,36 @@ class VideoCompositor:
         self.temp_dir.mkdir(parents=True, exist_ok=True)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
-        # FFmpeg settings
-        self.ffmpeg_path = "ffmpeg"
-        self.ffprobe_path = "ffprobe"
+        # FFmpeg settings, resolved to absolute paths once
+        self.ffmpeg_path = shutil.which("ffmpeg") or "ffmpeg"
+        self.ffprobe_path = shutil.which("ffprobe") or "ffprobe"
+
+        # Each encoder is multithreaded; cap how many run at once and give
+        # each an equal share of the cores instead of oversubscribing them
+        cpu_count = os.cpu_count() or 2
+        if max_concurrent_renders is None:
+            default_renders = max(1, cpu_count // 2)
+            try:
+                max_concurrent_renders = int(os.getenv("FFMPEG_CONCURRENCY", default_renders))
+            except ValueError:
+                logger.warning("Invalid FFMPEG_CONCURRENCY, using the default")
+                max_concurrent_renders = default_renders
+        max_concurrent_renders = max(1, max_concurrent_renders)
+        self.max_concurrent_renders = max_concurrent_renders
+        self._ffmpeg_semaphore = asyncio.Semaphore(max_concurrent_renders)
+        self._ffmpeg_threads = max(1, cpu_count // max_concurrent_renders)
+        self._probe_cache: OrderedDict[tuple[str, int, int], Dict[str, Any]] = OrderedDict()
+        
+        # Hardware encoder selection, resolved on first use
+        if hw_encode is None:
+            hw_encode = os.getenv("FFMPEG_HW_ENCODE", "1").lower() not in ("0", "false", "no")
+        self.hw_encode = hw_encode
+        self._encoders: Optional[set[str]] = None
+        
+        # FFmpeg availability and configure flags, filled by is_available
+        self._availability: Optional[tuple[str, bool]] = None
+        self.capabilities: set[str] = set()
+        self._resolved_encoders: Dict[str, str] = {}
         
         # Quality presets
         self.quality_presets = {
@@ -83,19 +144,31 @@ class VideoCompositor:
         """
         Check if FFmpeg is available
         
+        The result is cached per ffmpeg_path, and the build's --enable-*
+        configure flags are recorded in self.capabilities along the way.
+        
         Returns:
             True if FFmpeg is installed and accessible
         """
+        if self._availability is not None and self._availability[0] == self.ffmpeg_path:
+            return self._availability[1]
+        
         try:
-            subprocess.run(
+            result = subprocess.run(
                 [self.ffmpeg_path, "-version"],
                 capture_output=True,
-                check=True
+                check=True,
+                text=True
             )
-            return True
+            self.capabilities = set(re.findall(r"--enable-([\w-]+)", result.stdout))
+            available = True
         except (subprocess.CalledProcessError, FileNotFoundError):
             logger.warning("FFmpeg not found")
-            return False
+            self.capabilities = set()
+            available = False
+        
+        self._availability = (self.ffmpeg_path, available)
+        return available
     
     async def generate_video(
         self,
@@ -107,11 +180,18 @@ class VideoCompositor:
         script_text: str = "",
         heygem_enabled: bool = True,
         quality: str = "high",
-        aspect_ratio: str = "9:16"
+        aspect_ratio: str = "9:16",
+        captions: Optional[List[Dict[str, Any]]] = None,
+        music_path: Optional[str] = None,
+        music_volume: float = 0.3,
+        progress_callback: Optional[Callable[[float], None]] = None
     ) -> Dict[str, Any]:
         """
         Generate final video by compositing all elements
         
+        Captions and background music are applied in the same FFmpeg pass
+        as the composite, so the video is only encoded once.
+        
         Args:
             avatar_path: Path to avatar image/video
             audio_path: Path to audio file
@@ -122,10 +202,16 @@ class VideoCompositor:
             heygem_enabled: Use HeyGem for lip-sync
             quality: Video quality preset
             aspect_ratio: Aspect ratio preset
+            captions: Optional caption segments with start, end, text to burn in
+            music_path: Optional background music to mix under the voice
+            music_volume: Background music volume (0-1)
+            progress_callback: Optional callback given the seconds of video
+                rendered so far
             
         Returns:
             Video generation result
         """
+        srt_path = None
         try:
             # Verify inputs
             if not Path(avatar_path).exists():
@@ -134,29 +220,44 @@ class VideoCompositor:
             if not Path(audio_path).exists():
                 raise FileNotFoundError(f"Audio file not found: {audio_path}")
             
-            # Get quality settings
+            # Get quality settings, with the codec resolved to the encoder used
             quality_settings = self.quality_presets.get(quality, self.quality_presets["high"])
+            quality_settings = {
+                **quality_settings,
+                "codec": await self._resolve_encoder(quality_settings["codec"])
+            }
             width, height = self.aspect_ratios.get(aspect_ratio, self.aspect_ratios["9:16"])
             
             # Get audio duration
-            audio_duration = self._get_audio_duration(audio_path)
+            audio_duration = await self._get_audio_duration(audio_path)
             
             # Prepare output
             output_file = Path(output_path)
             output_file.parent.mkdir(parents=True, exist_ok=True)
             
+            if captions:
+                srt_path = self._write_srt(captions)
+            
+            if music_path and not Path(music_path).exists():
+                logger.warning(f"Background music not found, skipping: {music_path}")
+                music_path = None
+            
             # Generate the video
             if heygem_enabled and Path(avatar_path).suffix in [".mp4", ".mov"]:
                 # Avatar already has lip-sync applied
                 result = await self._composite_with_heygem_avatar(
                     avatar_path, audio_path, background_path, logo_path,
-                    output_path, quality_settings, width, height, audio_duration
+                    output_path, quality_settings, width, height, audio_duration,
+                    srt_path=srt_path, music_path=music_path, music_volume=music_volume,
+                    progress_callback=progress_callback
                 )
             else:
                 # Create static avatar with audio
                 result = await self._composite_static_avatar(
                     avatar_path, audio_path, background_path, logo_path,
-                    output_path, quality_settings, width, height, audio_duration
+                    output_path, quality_settings, width, height, audio_duration,
+                    srt_path=srt_path, music_path=music_path, music_volume=music_volume,
+                    progress_callback=progress_callback
                 )
             
             # Verify output
@@ -176,6 +277,53 @@ class VideoCompositor:
                 "error": str(e),
                 "output_path": None
             }
+        finally:
+            if srt_path:
+                Path(srt_path).unlink(missing_ok=True)
+    
+    async def generate_videos_batch(
+        self,
+        jobs: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate several videos, probing upcoming jobs while others encode
+        
+        A probe stage feeds a bounded queue that one encode worker per
+        render slot drains, so ffprobe work for the next jobs overlaps with
+        the encodes in flight instead of stalling between them.
+        
+        Args:
+            jobs: Keyword arguments for generate_video, one dict per video
+            
+        Returns:
+            Generation results in the same order as jobs
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+        probed: asyncio.Queue = asyncio.Queue(maxsize=BATCH_QUEUE_SIZE)
+        workers = min(self.max_concurrent_renders, len(jobs))
+        
+        async def probe_stage() -> None:
+            for index, job in enumerate(jobs):
+                # Warm the probe cache; generate_video reports bad inputs
+                try:
+                    await self._probe(job["audio_path"])
+                except (OSError, RuntimeError, ValueError):
+                    pass
+                await probed.put((index, job))
+            for _ in range(workers):
+                await probed.put(None)
+        
+        async def encode_stage() -> None:
+            while (item := await probed.get()) is not None:
+                index, job = item
+                results[index] = await self.generate_video(**job)
+        
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(probe_stage())
+            for _ in range(workers):
+                tg.create_task(encode_stage())
+        
+        return results
     
     async def _composite_with_heygem_avatar(
         self,
@@ -187,7 +335,11 @@ class VideoCompositor:
         quality_settings: Dict[str, Any],
         width: int,
         height: int,
-        duration: float
+        duration: float,
+        srt_path: Optional[str] = None,
+        music_path: Optional[str] = None,
+        music_volume: float = 0.3,
+        progress_callback: Optional[Callable[[float], None]] = None
     ) -> Dict[str, Any]:
         """
         Composite video with HeyGem avatar (already lip-synced)
@@ -202,65 +354,102 @@ class VideoCompositor:
             width: Output width
             height: Output height
             duration: Audio duration
+            srt_path: Optional SRT file to burn in
+            music_path: Optional background music
+            music_volume: Background music volume
+            progress_callback: Optional render progress callback
             
         Returns:
             Generation result
         """
         try:
-            # Build FFmpeg filter complex
+            # Check optional inputs once so the graph and inputs agree
+            has_bg = bool(background_path and Path(background_path).exists())
+            has_logo = bool(logo_path and Path(logo_path).exists())
+            
+            # Nothing to composite: mux the avatar's video as-is when it is
+            # already in the output format
+            if not (has_bg or has_logo or srt_path or music_path) and await self._can_stream_copy(
+                avatar_path, quality_settings["codec"], width, height
+            ):
+                cmd = [
+                    self.ffmpeg_path, "-y",
+                    "-i", avatar_path,
+                    "-i", audio_path,
+                    "-map", "0:v:0",
+                    "-map", "1:a:0",
+                    "-c:v", "copy",
+                    "-c:a", "aac",
+                    "-b:a", "192k",
+                    "-shortest",
+                    output_path
+                ]
+                return await self._run_ffmpeg(cmd, progress_callback)
+            
+            # Build FFmpeg command; inputs are numbered in the order added
+            cmd = [
+                self.ffmpeg_path, "-y",
+                "-i", avatar_path
+            ]
+            
+            if has_bg:
+                # Repeat the background for the whole clip; the avatar overlay
+                # decides where it ends
+                bg_loop = (
+                    ["-loop", "1"] if Path(background_path).suffix.lower() in STILL_IMAGE_EXTENSIONS
+                    else ["-stream_loop", "-1"]
+                )
+                bg_idx = cmd.count("-i")
+                cmd.extend([*bg_loop, "-i", background_path])
+            
+            if has_logo:
+                logo_idx = cmd.count("-i")
+                cmd.extend(["-i", logo_path])
+            
+            audio_idx = cmd.count("-i")
+            cmd.extend(["-i", audio_path])
+            if music_path:
+                cmd.extend(["-stream_loop", "-1", "-i", music_path])
+            
+            # Build FFmpeg filter complex, one labeled chain per step
             filters = []
             
             # Add background
-            if background_path and Path(background_path).exists():
+            if has_bg:
                 filters.append(
-                    f"[1:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
-                    f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1[bg];"
+                    f"[{bg_idx}:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                    f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1[bg]"
                 )
-                input_count = 2
             else:
-                filters.append(
-                    f"color=c=black:s={width}x{height}:d={duration}[bg];"
-                )
-                input_count = 1
+                filters.append(f"color=c=black:s={width}x{height}:d={duration}[bg]")
             
-            # Add avatar (centered, scaled to fit)
-            avatar_scale = f"scale={int(width*0.6)}:{int(width*0.6*0.5625)}:force_original_aspect_ratio=decrease"
+            # Add avatar (scaled to fit, centered by the overlay)
             filters.append(
-                f"[0:v]{avatar_scale},"
-                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2[avatar];"
+                f"[0:v]scale={int(width*0.6)}:{int(width*0.6*0.5625)}:force_original_aspect_ratio=decrease[avatar]"
             )
             
-            # Composite avatar over background
-            filters.append("[bg][avatar]overlay=(W-w)/2:(H-h)/2+50")
-            
-            # Add logo if provided
-            if logo_path and Path(logo_path).exists():
-                logo_scale = f"scale={int(width*0.15)}:-1"
+            # Composite avatar over background, then the logo in the corner
+            if has_logo:
+                filters.append("[bg][avatar]overlay=(W-w)/2:(H-h)/2+50:shortest=1[vid]")
+                filters.append(f"[{logo_idx}:v]scale={int(width*0.15)}:-1[logo]")
                 filters.append(
-                    f"[out]";
-                    f"[1:v]{logo_scale}[logo];"
-                    f"[composite][logo]overlay=W-{int(width*0.18)}:H-{int(width*0.18)}"
+                    f"[vid][logo]overlay=W-{int(width*0.18)}:H-{int(width*0.18)}[out]"
                 )
+            else:
+                filters.append("[bg][avatar]overlay=(W-w)/2:(H-h)/2+50:shortest=1[out]")
             
-            # Build FFmpeg command
-            cmd = [
-                self.ffmpeg_path, "-y",
-                "-i", avatar_path
-            ]
-            
-            if background_path and Path(background_path).exists():
-                cmd.extend(["-i", background_path])
-            
-            if logo_path and Path(logo_path).exists():
-                cmd.extend(["-i", logo_path])
+            finishing, video_out, audio_out = self._finishing_filters(
+                "[out]", f"{audio_idx}:a", duration,
+                srt_path=srt_path,
+                music_input=audio_idx + 1 if music_path else None,
+                music_volume=music_volume
+            )
             
             cmd.extend([
-                "-i", audio_path,
-                "-filter_complex", "".join(filters),
-                "-map", "[out]",
-                "-map", f"{'3' if (background_path and logo_path) else '2'}:a",
-                "-c:v", quality_settings["codec"],
-                "-b:v", quality_settings["bitrate"],
+                "-filter_complex", ";".join([*filters, *finishing]),
+                "-map", video_out,
+                "-map", audio_out,
+                *self._video_encode_args(quality_settings),
                 "-c:a", "aac",
                 "-b:a", "192k",
                 "-pix_fmt", "yuv420p",
@@ -269,7 +458,7 @@ class VideoCompositor:
             ])
             
             # Run FFmpeg
-            result = await self._run_ffmpeg(cmd)
+            result = await self._run_ffmpeg(cmd, progress_callback)
             
             return result
             
@@ -287,7 +476,11 @@ class VideoCompositor:
         quality_settings: Dict[str, Any],
         width: int,
         height: int,
-        duration: float
+        duration: float,
+        srt_path: Optional[str] = None,
+        music_path: Optional[str] = None,
+        music_volume: float = 0.3,
+        progress_callback: Optional[Callable[[float], None]] = None
     ) -> Dict[str, Any]:
         """
         Composite video with static avatar image (simple lip-sync simulation)
@@ -302,116 +495,108 @@ class VideoCompositor:
             width: Output width
             height: Output height
             duration: Audio duration
+            srt_path: Optional SRT file to burn in
+            music_path: Optional background music
+            music_volume: Background music volume
+            progress_callback: Optional render progress callback
             
         Returns:
             Generation result
         """
         try:
-            # Build FFmpeg filter complex for static image with audio
+            # Check optional inputs once so the graph and inputs agree
+            has_bg = bool(background_path and Path(background_path).exists())
+            has_logo = bool(logo_path and Path(logo_path).exists())
+            
+            fps = quality_settings["fps"]
+            still_image = Path(avatar_path).suffix.lower() in STILL_IMAGE_EXTENSIONS
+            
+            # A still image is decoded once per second and the fps filter
+            # duplicates it up to the output rate
+            avatar_input = ["-loop", "1", "-framerate", "1"] if still_image else []
+            video_encode = self._video_encode_args(quality_settings, still_image=still_image)
+            
+            # Build FFmpeg command; inputs are numbered in the order added
+            cmd = [
+                self.ffmpeg_path, "-y",
+                *avatar_input,
+                "-i", avatar_path
+            ]
+            
+            if has_bg:
+                bg_loop = (
+                    ["-loop", "1"] if Path(background_path).suffix.lower() in STILL_IMAGE_EXTENSIONS
+                    else ["-stream_loop", "-1"]
+                )
+                bg_idx = cmd.count("-i")
+                cmd.extend([*bg_loop, "-i", background_path])
+            
+            if has_logo:
+                logo_idx = cmd.count("-i")
+                cmd.extend(["-loop", "1", "-i", logo_path])
+            
+            audio_idx = cmd.count("-i")
+            cmd.extend(["-i", audio_path])
+            if music_path:
+                cmd.extend(["-stream_loop", "-1", "-i", music_path])
+            
+            # Build FFmpeg filter complex, one labeled chain per step
             filters = []
             
             # Create background
-            if background_path and Path(background_path).exists():
+            if has_bg:
                 filters.append(
-                    f"[1:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
-                    f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1[bg];"
+                    f"[{bg_idx}:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                    f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1[bg]"
                 )
-                input_count = 2
             else:
-                # Create gradient background
-                filters.append(
-                    f"color=c=#1a1a2e:s={width}x{height}:d={duration}[bg];"
-                )
-                input_count = 1
+                filters.append(f"color=c=#1a1a2e:s={width}x{height}:r={fps}:d={duration}[bg]")
             
-            # Scale and position avatar
-            avatar_scale = f"scale={int(width*0.7)}:{int(width*0.7*0.5625)}:force_original_aspect_ratio=decrease"
+            # Scale the avatar and fade it in and out over the background
             filters.append(
-                f"[0:v]{avatar_scale},"
-                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,"
-                f"fade=t=in:st=0:d=1,fade=t=out:st={duration-1}:d=1[avatar];"
+                f"[0:v]fps={fps},"
+                f"scale={int(width*0.7)}:{int(width*0.7*0.5625)}:force_original_aspect_ratio=decrease,"
+                f"format=yuva420p,"
+                f"fade=t=in:st=0:d=1:alpha=1,"
+                f"fade=t=out:st={max(duration - 1, 0)}:d=1:alpha=1[avatar]"
             )
             
-            # Composite avatar over background
-            filters.append("[bg][avatar]overlay=(W-w)/2:(H-h)/2+80")
-            
-            # Add subtle zoom effect to background
-            if not background_path or not Path(background_path).exists():
+            # Composite avatar over background, then the logo in the corner
+            if has_logo:
+                filters.append("[bg][avatar]overlay=(W-w)/2:(H-h)/2+80[vid]")
                 filters.append(
-                    f"[bg]zoompan=z='min(zoom+0.001,1.1)':d={int(duration*25)}:s={width}x{height}:"
-                    f"x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':fps=25[bg_zoomed];"
+                    f"[{logo_idx}:v]scale={int(width*0.12)}:-1,format=yuva420p,"
+                    f"fade=t=in:st=0:d=0.5:alpha=1,"
+                    f"fade=t=out:st={max(duration - 0.5, 0)}:d=0.5:alpha=1[logo]"
                 )
-                filters.append("[bg_zoomed][avatar]overlay=(W-w)/2:(H-h)/2+80")
-            
-            # Add logo if provided
-            if logo_path and Path(logo_path).exists():
-                logo_scale = f"scale={int(width*0.12)}:-1"
                 filters.append(
-                    f"[2:v]{logo_scale},"
-                    f"fade=t=in:st=0:d=0.5,fade=t=out:st={duration-0.5}:d=0.5[logo];"
+                    f"[vid][logo]overlay=W-{int(width*0.15)}:H-{int(width*0.15)}[out]"
                 )
-                filters.append(
-                    f"[composite][logo]overlay=W-{int(width*0.15)}:H-{int(width*0.15)}"
-                )
-            
-            # Build FFmpeg command
-            cmd = [
-                self.ffmpeg_path, "-y",
-                "-loop", "1", "-framerate", "30",
-                "-i", avatar_path,
-                "-stream_loop", "-1",
-                "-i", background_path if background_path and Path(background_path).exists() else "null",
-            ]
+            else:
+                filters.append("[bg][avatar]overlay=(W-w)/2:(H-h)/2+80[out]")
             
-            if logo_path and Path(logo_path).exists():
-                cmd.extend(["-loop", "1", "-i", logo_path])
+            finishing, video_out, audio_out = self._finishing_filters(
+                "[out]", f"{audio_idx}:a", duration,
+                srt_path=srt_path,
+                music_input=audio_idx + 1 if music_path else None,
+                music_volume=music_volume
+            )
             
             cmd.extend([
-                "-i", audio_path,
-                "-filter_complex", "".join(filters) if not (background_path and Path(background_path).exists()) else "".join(filters),
-                "-map", "[out]",
-                "-map", f"{'3' if logo_path and Path(logo_path).exists() else '2'}:a",
-                "-c:v", quality_settings["codec"],
-                "-b:v", quality_settings["bitrate"],
+                "-filter_complex", ";".join([*filters, *finishing]),
+                "-map", video_out,
+                "-map", audio_out,
+                *video_encode,
                 "-c:a", "aac",
                 "-b:a", "192k",
                 "-pix_fmt", "yuv420p",
-                "-r", str(quality_settings["fps"]),
+                "-r", str(fps),
                 "-t", str(duration),
                 "-shortest",
                 output_path
             ])
             
-            # Remove null input if not needed
-            if not background_path or not Path(background_path).exists():
-                cmd = [
-                    self.ffmpeg_path, "-y",
-                    "-loop", "1", "-framerate", "30",
-                    "-i", avatar_path,
-                ]
-                if logo_path and Path(logo_path).exists():
-                    cmd.extend(["-loop", "1", "-i", logo_path])
-                
-                cmd.extend([
-                    "-i", audio_path,
-                    "-filter_complex", f"color=c=#1a1a2e:s={width}x{height}:d={duration}[bg];"
-                                      f"[0:v]scale={int(width*0.7)}:{int(width*0.7*0.5625)}:force_original_aspect_ratio=decrease,"
-                                      f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2[avatar];"
-                                      f"[bg][avatar]overlay=(W-w)/2:(H-h)/2+80",
-                    "-map", "[out]",
-                    "-map", f"{'2' if logo_path and Path(logo_path).exists() else '2'}:a",
-                    "-c:v", quality_settings["codec"],
-                    "-b:v", quality_settings["bitrate"],
-                    "-c:a", "aac",
-                    "-b:a", "192k",
-                    "-pix_fmt", "yuv420p",
-                    "-r", str(quality_settings["fps"]),
-                    "-t", str(duration),
-                    "-shortest",
-                    output_path
-                ])
-            
-            result = await self._run_ffmpeg(cmd)
+            result = await self._run_ffmpeg(cmd, progress_callback)
             
             return result
             
@@ -419,24 +604,265 @@ class VideoCompositor:
             logger.error(f"Static avatar composite error: {e}")
             return {"success": False, "error": str(e)}
     
-    async def _run_ffmpeg(self, cmd: List[str]) -> Dict[str, Any]:
+    def _finishing_filters(
+        self,
+        video: str,
+        audio: str,
+        duration: float,
+        srt_path: Optional[str] = None,
+        music_input: Optional[int] = None,
+        music_volume: float = 0.3,
+        fade_in: float = 2.0,
+        fade_out: float = 2.0
+    ) -> tuple[List[str], str, str]:
+        """
+        Build the caption burn-in and music mixing stages of a filter graph
+        
+        Args:
+            video: Video to finish, as a filter label ("[out]") or stream ("0:v")
+            audio: Voice audio, as a filter label or stream ("2:a")
+            duration: Output duration in seconds
+            srt_path: Optional SRT file to burn in
+            music_input: Input index of the background music, if any
+            music_volume: Music volume (0-1)
+            fade_in: Music fade in duration
+            fade_out: Music fade out duration
+            
+        Returns:
+            Tuple of (filter chains, video to map, audio to map)
+        """
+        def ref(stream: str) -> str:
+            return stream if stream.startswith("[") else f"[{stream}]"
+        
+        chains = []
+        
+        if srt_path:
+            chains.append(f"{ref(video)}subtitles={self._filter_path(srt_path)}[captioned]")
+            video = "[captioned]"
+        
+        if music_input is not None:
+            chains.append(
+                f"[{music_input}:a]volume={music_volume},"
+                f"afade=t=in:st=0:d={fade_in},"
+                f"afade=t=out:st={max(duration - fade_out, 0)}:d={fade_out}[music]"
+            )
+            chains.append(f"{ref(audio)}[music]amix=inputs=2:duration=first:normalize=0[mixed]")
+            audio = "[mixed]"
+        
+        return chains, video, audio
+    
+    def _video_encode_args(
+        self,
+        quality_settings: Dict[str, Any],
+        still_image: bool = False
+    ) -> List[str]:
+        """
+        Build the video encoder arguments for a quality preset
+        
+        Args:
+            quality_settings: Quality settings with the resolved encoder
+            still_image: Whether the source is a single still frame
+            
+        Returns:
+            FFmpeg output arguments
+        """
+        codec = quality_settings["codec"]
+        args = ["-c:v", codec]
+        
+        if codec.endswith("_nvenc"):
+            # Quality-targeted VBR, capped at the preset bitrate
+            args.extend([
+                "-rc", "vbr", "-cq", str(NVENC_CQ),
+                "-b:v", "0", "-maxrate", quality_settings["bitrate"]
+            ])
+        else:
+            args.extend(["-b:v", quality_settings["bitrate"]])
+        
+        if still_image:
+            # Long GOP: P-frames of an unchanging image are nearly empty
+            args.extend(["-g", str(quality_settings["fps"] * 10)])
+            if codec in HW_ENCODERS:
+                args.extend(["-preset", "veryfast"])
+            if codec == "libx264":
+                args.extend(["-tune", "stillimage"])
+        
+        return args
+    
+    async def _resolve_encoder(self, codec: str) -> str:
+        """
+        Pick the encoder for a software codec, preferring working hardware
+        
+        Args:
+            codec: Software codec from the quality preset (e.g. "libx264")
+            
+        Returns:
+            Encoder name to pass to -c:v
+        """
+        if not self.hw_encode or codec not in HW_ENCODERS:
+            return codec
+        
+        if codec not in self._resolved_encoders:
+            encoder = codec
+            available = await self._list_encoders()
+            for candidate in HW_ENCODERS[codec]:
+                if candidate in available and await self._encoder_works(candidate):
+                    logger.info(f"Using hardware encoder {candidate} for {codec}")
+                    encoder = candidate
+                    break
+            self._resolved_encoders[codec] = encoder
+        
+        return self._resolved_encoders[codec]
+    
+    async def _list_encoders(self) -> set[str]:
+        """Return the video encoders compiled into FFmpeg (listed once)"""
+        if self._encoders is None:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    self.ffmpeg_path, "-hide_banner", "-encoders",
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL
+                )
+                stdout, _ = await process.communicate()
+                self._encoders = set(
+                    re.findall(r"^\s*V\S*\s+(\S+)", stdout.decode(errors="replace"), re.MULTILINE)
+                )
+            except OSError as e:
+                logger.warning(f"Could not list FFmpeg encoders: {e}")
+                self._encoders = set()
+        
+        return self._encoders
+    
+    async def _encoder_works(self, encoder: str) -> bool:
+        """
+        Check that an encoder can actually open a device by encoding one frame
+        
+        Hardware encoders are often compiled in without a usable GPU.
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.ffmpeg_path, "-hide_banner", "-v", "error",
+                "-f", "lavfi", "-i", "color=s=256x256:d=0.1",
+                "-frames:v", "1", "-pix_fmt", "yuv420p",
+                "-c:v", encoder, "-f", "null", "-",
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+        except OSError:
+            return False
+        
+        try:
+            return await asyncio.wait_for(process.wait(), timeout=10) == 0
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return False
+    
+    async def _can_stream_copy(
+        self,
+        video_path: str,
+        encoder: str,
+        width: int,
+        height: int
+    ) -> bool:
+        """
+        Check whether a video already matches the output codec and frame size
+        
+        Args:
+            video_path: Path to video
+            encoder: Encoder the output would use
+            width: Output width
+            height: Output height
+            
+        Returns:
+            True if its video stream can be copied without re-encoding
+        """
+        try:
+            info = await self._probe(video_path)
+        except (OSError, RuntimeError, ValueError):
+            return False
+        
+        stream = next((s for s in info.get("streams", []) if s.get("codec_type") == "video"), None)
+        if stream is None:
+            return False
+        
+        # libx264/h264_nvenc/... -> h264, libx265/hevc_nvenc/... -> hevc
+        codec_name = {"libx264": "h264", "libx265": "hevc"}.get(encoder, encoder.split("_")[0])
+        return (
+            stream.get("codec_name") == codec_name
+            and stream.get("width") == width
+            and stream.get("height") == height
+            and stream.get("pix_fmt") == "yuv420p"
+        )
+    
+    def _filter_path(self, path: str) -> str:
+        """Quote a file path for use as a filter option value (Windows-safe)"""
+        escaped = str(path).replace("\\", "/").replace(":", "\\:")
+        return f"'{escaped}'"
+    
+    async def _run_ffmpeg(
+        self,
+        cmd: List[str],
+        progress_callback: Optional[Callable[[float], None]] = None
+    ) -> Dict[str, Any]:
         """
         Run FFmpeg command
         
+        A -filter_complex graph is written to a temporary script file and
+        passed with -filter_complex_script, so large caption/overlay graphs
+        never run into the argument length limit. Output is read line by
+        line as it arrives and only the end of stderr is kept.
+        
         Args:
             cmd: FFmpeg command list
+            progress_callback: Optional callback given the seconds of output
+                written so far
             
         Returns:
             Execution result
         """
+        # Stats lines are \r-terminated and would pile up as one "line";
+        # progress comes from -progress on stdout instead
+        progress_args = ["-progress", "pipe:1"] if progress_callback else []
+        cmd = [
+            cmd[0], "-hide_banner", "-nostats", *progress_args,
+            *cmd[1:-1],
+            # Limit the encoder's threads to its share of the cores
+            "-threads", str(self._ffmpeg_threads),
+            cmd[-1]
+        ]
+        
+        script_path = None
+        if "-filter_complex" in cmd:
+            idx = cmd.index("-filter_complex")
+            script_path = self.temp_dir / f"filtergraph_{uuid.uuid4().hex}.txt"
+            script_path.write_text(cmd[idx + 1], encoding="utf-8")
+            cmd[idx:idx + 2] = ["-filter_complex_script", str(script_path)]
+        
         try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
+            stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+            
+            async def read_stderr(reader: asyncio.StreamReader) -> None:
+                async for line in reader:
+                    stderr_tail.append(line.decode(errors="replace").rstrip())
             
-            stdout, stderr = await process.communicate()
+            async def read_progress(reader: asyncio.StreamReader) -> None:
+                async for line in reader:
+                    key, _, value = line.decode(errors="replace").strip().partition("=")
+                    if key == "out_time_us" and value.isdigit():
+                        progress_callback(int(value) / 1_000_000)
+            
+            async with self._ffmpeg_semaphore:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdout=asyncio.subprocess.PIPE if progress_callback else asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE,
+                    limit=1024 * 1024
+                )
+                
+                readers = [read_stderr(process.stderr)]
+                if progress_callback:
+                    readers.append(read_progress(process.stdout))
+                await asyncio.gather(*readers, process.wait())
             
             if process.returncode == 0:
                 return {
@@ -445,7 +871,7 @@ class VideoCompositor:
                     "message": "Video generated successfully"
                 }
             else:
-                error_msg = stderr.decode()[:500] if stderr else "Unknown error"
+                error_msg = "\n".join(stderr_tail) or "Unknown error"
                 logger.error(f"FFmpeg error: {error_msg}")
                 return {
                     "success": False,
@@ -456,8 +882,50 @@ class VideoCompositor:
         except Exception as e:
             logger.error(f"FFmpeg execution error: {e}")
             return {"success": False, "error": str(e)}
+        finally:
+            if script_path:
+                script_path.unlink(missing_ok=True)
     
-    def _get_audio_duration(self, audio_path: str) -> float:
+    async def _probe(self, path: str) -> Dict[str, Any]:
+        """
+        Run ffprobe once for a file's format and stream information
+        
+        Results are cached by (path, mtime, size), so an unchanged file is
+        only probed once.
+        
+        Args:
+            path: Path to media file
+            
+        Returns:
+            Parsed ffprobe JSON output
+        """
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        info = self._probe_cache.get(key)
+        if info is not None:
+            self._probe_cache.move_to_end(key)
+            return info
+        
+        process = await asyncio.create_subprocess_exec(
+            self.ffprobe_path, "-v", "quiet",
+            "-print_format", "json",
+            "-show_format",
+            "-show_streams",
+            path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, _ = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"ffprobe exited with {process.returncode}")
+        
+        info = json.loads(stdout)
+        self._probe_cache[key] = info
+        if len(self._probe_cache) > PROBE_CACHE_SIZE:
+            self._probe_cache.popitem(last=False)
+        return info
+    
+    async def _get_audio_duration(self, audio_path: str) -> float:
         """
         Get audio file duration in seconds
         
@@ -468,25 +936,12 @@ class VideoCompositor:
             Duration in seconds
         """
         try:
-            import subprocess
-            
-            result = subprocess.run(
-                [
-                    self.ffprobe_path, "-v", "error",
-                    "-show_entries", "format=duration",
-                    "-of", "default=noprint_wrappers=1:nokey=1",
-                    audio_path
-                ],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            return float(result.stdout.strip())
-        except:
+            info = await self._probe(audio_path)
+            return float(info["format"]["duration"])
+        except (OSError, RuntimeError, ValueError, KeyError):
             return 30.0  # Default to 30 seconds
     
-    def add_captions(
+    async def add_captions(
         self,
         video_path: str,
         captions: List[Dict[str, Any]],
@@ -505,36 +960,51 @@ class VideoCompositor:
         Returns:
             Processing result
         """
-        # This is a simplified implementation
-        # In production, use proper subtitle burning
-        
+        srt_path = None
         try:
-            # Create SRT file from captions
-            srt_content = self._create_srt(captions)
-            srt_path = self.temp_dir / "captions.srt"
-            
-            with open(srt_path, "w", encoding="utf-8") as f:
-                f.write(srt_content)
+            # Create a per-call SRT file so concurrent jobs don't share one
+            srt_path = self._write_srt(captions)
             
             # Build FFmpeg command with subtitles
+            finishing, video_out, audio_out = self._finishing_filters(
+                "0:v", "0:a?", 0, srt_path=srt_path
+            )
+            
             cmd = [
                 self.ffmpeg_path, "-y",
                 "-i", video_path,
-                "-vf", f"subtitles={srt_path}",
+                "-filter_complex", ";".join(finishing),
+                "-map", video_out,
+                "-map", audio_out,
                 "-c:a", "copy",
                 output_path
             ]
             
-            result = asyncio.run(self._run_ffmpeg(cmd))
-            
-            # Clean up
-            srt_path.unlink(missing_ok=True)
-            
-            return result
+            return await self._run_ffmpeg(cmd)
             
         except Exception as e:
             logger.error(f"Caption addition error: {e}")
             return {"success": False, "error": str(e)}
+        finally:
+            if srt_path:
+                Path(srt_path).unlink(missing_ok=True)
+    
+    def _write_srt(self, captions: List[Dict[str, Any]]) -> str:
+        """
+        Write captions to a uniquely named SRT file in the temp directory
+        
+        Args:
+            captions: List of caption segments
+            
+        Returns:
+            Path to the SRT file (the caller removes it)
+        """
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", prefix="captions_", suffix=".srt",
+            dir=self.temp_dir, delete=False
+        ) as f:
+            f.write(self._create_srt(captions))
+        return f.name
     
     def _create_srt(self, captions: List[Dict[str, Any]]) -> str:
         """
@@ -546,27 +1016,24 @@ class VideoCompositor:
         Returns:
             SRT formatted string
         """
-        srt_lines = []
-        
-        for i, caption in enumerate(captions, 1):
-            start_time = self._format_srt_time(caption.get("start", 0))
-            end_time = self._format_srt_time(caption.get("end", caption.get("start", 0) + 3))
-            text = caption.get("text", "")
-            
-            srt_lines.append(f"{i}\n{start_time} --> {end_time}\n{text}\n")
-        
-        return "\n".join(srt_lines)
+        fmt = self._format_srt_time
+        return "\n".join(
+            f"{i}\n"
+            f"{fmt(caption.get('start', 0))} --> {fmt(caption.get('end', caption.get('start', 0) + 3))}\n"
+            f"{caption.get('text', '')}\n"
+            for i, caption in enumerate(captions, 1)
+        )
     
     def _format_srt_time(self, seconds: float) -> str:
         """Format seconds to SRT time format"""
-        hours = int(seconds / 3600)
-        minutes = int((seconds % 3600) / 60)
-        secs = int(seconds % 60)
-        millis = int((seconds % 1) * 1000)
+        # Work in whole milliseconds so the fields can't drift from float error
+        minutes, millis = divmod(max(round(seconds * 1000), 0), 60_000)
+        hours, minutes = divmod(minutes, 60)
+        secs, millis = divmod(millis, 1000)
         
         return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
     
-    def add_background_music(
+    async def add_background_music(
         self,
         video_path: str,
         music_path: str,
@@ -591,33 +1058,38 @@ class VideoCompositor:
         """
         try:
             # Get video duration
-            duration = self._get_video_duration(video_path)
+            duration = await self._get_video_duration(video_path)
+            
+            finishing, video_out, audio_out = self._finishing_filters(
+                "0:v", "0:a", duration,
+                music_input=1,
+                music_volume=volume,
+                fade_in=fade_in,
+                fade_out=fade_out
+            )
             
             cmd = [
                 self.ffmpeg_path, "-y",
                 "-i", video_path,
-                "-i", music_path,
-                "-filter_complex",
-                f"[0:a][1:a]amix=inputs=2:duration=first:weights=1 {volume}[outa];"
-                f"[1:a]afade=t=in:st=0:d={fade_in},afade=t=out:st={duration-fade_out}:d={fade_out}[music];"
-                f"[outa][music]amix=inputs=2:duration=first",
-                "-map", "0:v",
-                "-map", "[outa]",
+                "-stream_loop", "-1", "-i", music_path,
+                "-filter_complex", ";".join(finishing),
+                "-map", video_out,
+                "-map", audio_out,
                 "-c:v", "copy",
                 output_path
             ]
             
-            return asyncio.run(self._run_ffmpeg(cmd))
+            return await self._run_ffmpeg(cmd)
             
         except Exception as e:
             logger.error(f"Background music error: {e}")
             return {"success": False, "error": str(e)}
     
-    def _get_video_duration(self, video_path: str) -> float:
+    async def _get_video_duration(self, video_path: str) -> float:
         """Get video duration in seconds"""
-        return self._get_audio_duration(video_path)
+        return await self._get_audio_duration(video_path)
     
-    def extract_audio(
+    async def extract_audio(
         self,
         video_path: str,
         output_path: str,
@@ -644,13 +1116,13 @@ class VideoCompositor:
                 output_path
             ]
             
-            return asyncio.run(self._run_ffmpeg(cmd))
+            return await self._run_ffmpeg(cmd)
             
         except Exception as e:
             logger.error(f"Audio extraction error: {e}")
             return {"success": False, "error": str(e)}
     
-    def get_video_info(self, video_path: str) -> Dict[str, Any]:
+    async def get_video_info(self, video_path: str) -> Dict[str, Any]:
         """
         Get information about a video file
         
@@ -661,22 +1133,7 @@ class VideoCompositor:
             Video information dictionary
         """
         try:
-            import json
-            
-            result = subprocess.run(
-                [
-                    self.ffprobe_path, "-v", "quiet",
-                    "-print_format", "json",
-                    "-show_format",
-                    "-show_streams",
-                    video_path
-                ],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            info = json.loads(result.stdout)
+            info = await self._probe(video_path)
             
             video_stream = next(
                 (s for s in info.get("streams", []) if s.get("codec_type") == "video"),
@@ -695,7 +1152,7 @@ class VideoCompositor:
                 "video": {
                     "codec": video_stream.get("codec_name", "") if video_stream else "",
                     "resolution": f"{video_stream.get('width', 0)}x{video_stream.get('height', 0)}" if video_stream else "",
-                    "fps": eval(video_stream.get("r_frame_rate", "0")) if video_stream else 0,
+                    "fps": self._parse_rate(video_stream.get("r_frame_rate", "0")) if video_stream else 0,
                     "bitrate": int(video_stream.get("bit_rate", 0)) if video_stream else 0
                 },
                 "audio": {
@@ -708,3 +1165,12 @@ class VideoCompositor:
         except Exception as e:
             logger.error(f"Video info error: {e}")
             return {"path": video_path, "error": str(e)}
+    
+    def _parse_rate(self, rate: str) -> float:
+        """Parse an ffprobe frame rate such as "30000/1001" (0.0 if invalid)"""
+        num, _, den = rate.partition("/")
+        try:
+            den_value = int(den or 1)
+            return int(num) / den_value if den_value else 0.0
+        except ValueError:
+            return 0.0
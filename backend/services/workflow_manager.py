@@ -6,11 +6,15 @@ Orchestrates the step-by-step video creation workflow
 import json
 import uuid
 from pathlib import Path
-from datetime import datetime
 from typing import Dict, Any, Optional
 from loguru import logger
 
-from models.schemas import WorkflowStep, WorkflowState
+from pydantic import BaseModel
+
+from models.schemas import (
+    WorkflowStep, WorkflowState, TrendsState, ScriptState,
+    AudioState, AssetsState, VideoState, utc_now
+)
 
 
 class WorkflowManager:
@@ -60,6 +64,15 @@ class WorkflowManager:
             WorkflowStep.COMPLETE: [WorkflowStep.VIDEO]
         }
         
+        # Workflow state attribute holding each step's data
+        self.step_fields = {
+            "trends": WorkflowStep.TRENDS,
+            "script": WorkflowStep.SCRIPT,
+            "audio": WorkflowStep.AUDIO,
+            "assets": WorkflowStep.ASSETS,
+            "video": WorkflowStep.VIDEO
+        }
+        
         logger.info("Workflow Manager initialized")
     
     def create_project(self, name: str = "New Project") -> str:
@@ -168,7 +181,7 @@ class WorkflowManager:
         
         # Move to next step
         self.current_state.current_step = next_step
-        self.current_state.updated_at = datetime.now()
+        self.current_state.updated_at = utc_now()
         self._save_state()
         
         logger.info(f"Moved to step: {next_step.value}")
@@ -192,7 +205,7 @@ class WorkflowManager:
             return False
         
         self.current_state.current_step = self.step_order[current_index - 1]
-        self.current_state.updated_at = datetime.now()
+        self.current_state.updated_at = utc_now()
         self._save_state()
         
         logger.info(f"Moved to step: {self.current_state.current_step.value}")
@@ -213,23 +226,16 @@ class WorkflowManager:
             logger.error("No active project")
             return False
         
-        step_map = {
-            "trends": self.current_state.trends,
-            "script": self.current_state.script,
-            "audio": self.current_state.audio,
-            "assets": self.current_state.assets,
-            "video": self.current_state.video
-        }
-        
-        if step_name not in step_map:
+        if step_name not in self.step_fields:
             logger.error(f"Invalid step name: {step_name}")
             return False
         
-        # Merge data
-        step_data = step_map[step_name]
-        step_data.update(data)
+        # Merge data and re-validate into the typed step model
+        step_data = getattr(self.current_state, step_name)
+        merged = type(step_data).model_validate({**step_data.model_dump(), **data})
+        setattr(self.current_state, step_name, merged)
         
-        self.current_state.updated_at = datetime.now()
+        self.current_state.updated_at = utc_now()
         self._save_state()
         
         logger.info(f"Updated step: {step_name}")
@@ -246,7 +252,7 @@ class WorkflowManager:
             return False
         
         self.current_state.current_step = WorkflowStep.COMPLETE
-        self.current_state.updated_at = datetime.now()
+        self.current_state.updated_at = utc_now()
         self._save_state()
         
         logger.info(f"Workflow completed for project: {self.current_state.name}")
@@ -374,70 +380,62 @@ class WorkflowManager:
     
     def _is_step_completed(self, step: WorkflowStep) -> bool:
         """Check if a step is completed"""
-        step_map = {
-            WorkflowStep.TRENDS: self.current_state.trends,
-            WorkflowStep.SCRIPT: self.current_state.script,
-            WorkflowStep.AUDIO: self.current_state.audio,
-            WorkflowStep.ASSETS: self.current_state.assets,
-            WorkflowStep.VIDEO: self.current_state.video
-        }
-        
-        step_data = step_map.get(step, {})
+        state = self.current_state
         
         if step == WorkflowStep.TRENDS:
-            return bool(step_data.get("selected"))
+            return state.trends.selected is not None
         
         if step == WorkflowStep.SCRIPT:
-            return bool(step_data.get("content"))
+            return bool(state.script.content)
         
         if step == WorkflowStep.AUDIO:
-            return bool(step_data.get("path"))
+            return bool(state.audio.path)
         
         if step == WorkflowStep.ASSETS:
-            return bool(step_data.get("avatar") or step_data.get("background"))
+            return bool(state.assets.avatar or state.assets.background)
         
         if step == WorkflowStep.VIDEO:
-            return bool(step_data.get("output_path"))
+            return bool(state.video.output_path)
         
         return False
     
-    def _get_current_step_data(self) -> Dict[str, Any]:
+    def _get_current_step_data(self) -> Optional[BaseModel]:
         """Get data for the current step"""
         if not self.current_state:
-            return {}
+            return None
         
-        step_map = {
-            WorkflowStep.TRENDS: self.current_state.trends,
-            WorkflowStep.SCRIPT: self.current_state.script,
-            WorkflowStep.AUDIO: self.current_state.audio,
-            WorkflowStep.ASSETS: self.current_state.assets,
-            WorkflowStep.VIDEO: self.current_state.video
-        }
+        step = self.current_state.current_step
+        for field, field_step in self.step_fields.items():
+            if field_step == step:
+                return getattr(self.current_state, field)
         
-        return step_map.get(self.current_state.current_step, {})
+        return None
     
-    def _calculate_step_progress(self, step_data: Dict[str, Any]) -> float:
+    def _calculate_step_progress(self, step_data: Optional[BaseModel]) -> float:
         """Calculate progress within current step (0-20)"""
-        if not step_data:
-            return 0
-        
         # This is a simplified calculation
         # Each step has different completion criteria
-        if "trends" in step_data and "selected" in step_data:
-            return 20 if step_data.get("selected") else 10
-        
-        if "content" in step_data:
-            return 20 if step_data.get("edited") else 15
-        
-        if "path" in step_data:
-            return 20 if step_data.get("path") else 10
-        
-        if "avatar" in step_data or "background" in step_data:
-            assets_count = sum(1 for k in ["avatar", "logo", "background"] if step_data.get(k))
+        if isinstance(step_data, TrendsState):
+            if step_data.selected:
+                return 20
+            return 10 if step_data.trends else 0
+        
+        if isinstance(step_data, ScriptState):
+            if not step_data.content:
+                return 0
+            return 20 if step_data.edited else 15
+        
+        if isinstance(step_data, AudioState):
+            return 20 if step_data.path else 0
+        
+        if isinstance(step_data, AssetsState):
+            assets_count = sum(
+                1 for asset in (step_data.avatar, step_data.logo, step_data.background) if asset
+            )
             return min(assets_count * 6.67, 20)
         
-        if "output_path" in step_data:
-            return 20
+        if isinstance(step_data, VideoState):
+            return 20 if step_data.output_path else 0
         
         return 0
     
@@ -218,10 +218,24 @@ const useWorkflowStore = create((set, get) => ({
     set({ isLoading: true, error: null });
     try {
       const response = await api.generateVideo(useHeygem, quality);
-      set({ 
+      const { project_id, path, url } = response.data;
+
+      // Rendering runs as a background job; poll until it settles
+      let progress = (await api.getVideoProgress(project_id)).data;
+      while (progress.status !== 'completed' && progress.status !== 'failed') {
+        set({ video: { ...get().video, progress: progress.progress || 0 } });
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        progress = (await api.getVideoProgress(project_id)).data;
+      }
+
+      if (progress.status === 'failed') {
+        throw new Error(progress.error_message || 'Video generation failed');
+      }
+
+      set({
         video: {
-          outputPath: response.data.path,
-          url: response.data.url,
+          outputPath: path,
+          url,
           progress: 100
         },
         isLoading: false